@@ -21,17 +21,29 @@
 #
 
 import argparse
-import inspect
 import sys
 import logging
 import os
+import threading
+
+from collections import deque
+from functools import lru_cache
 
 from datetime import datetime
 from abc import ABCMeta, abstractmethod
 
 import warnings
 
+import numpy as np
 import pandas as pd
+
+try:
+    # optional - polars resamples plain ohlcv bars much faster than
+    # the pandas groupby path in utils.resample
+    import polars as pl
+except ImportError:
+    pl = None
+
 from kinetick.models import Position
 from numpy import nan
 
@@ -46,6 +58,11 @@ from kinetick.blotter import prepare_history
 # =============================================
 warnings.simplefilter(action='ignore', category=FutureWarning)
 
+# copy-on-write lets the handlers bind cheap shallow references instead
+# of defensive full-frame copies (pandas >= 2.0 only)
+if int(pd.__version__.split('.')[0]) >= 2:
+    pd.set_option('mode.copy_on_write', True)
+
 # check min, python version
 if sys.version_info < (3, 4):
     raise SystemError("Kinetick requires Python version >= 3.4")
@@ -62,6 +79,89 @@ asynctools.multitasking.createPool(__name__, __threads__)
 
 
 # =============================================
+# fixed kinetick csv schema - skips per-column type inference on load
+_CSV_TICK_DTYPES = {'symbol': 'category', 'symbol_group': 'category',
+                    'asset_class': 'category', 'last': 'float32',
+                    'lastsize': 'int32', 'bid': 'float32', 'ask': 'float32',
+                    'bidsize': 'int32', 'asksize': 'int32'}
+_CSV_BAR_DTYPES = {'symbol': 'category', 'symbol_group': 'category',
+                   'asset_class': 'category', 'open': 'float32',
+                   'high': 'float32', 'low': 'float32', 'close': 'float32',
+                   'volume': 'int32'}
+
+# bar frames with exactly these columns can take the polars resample
+# fast path (option greeks etc. stay on utils.resample)
+_PLAIN_BAR_COLS = frozenset(_CSV_BAR_DTYPES)
+
+
+def _empty_frame(dtypes):
+    """ typed empty frame - no dtype re-inference on first concat """
+    frame = pd.DataFrame({col: pd.Series(dtype=dt)
+                          for col, dt in dtypes.items()})
+    frame.index = pd.DatetimeIndex([])
+    return frame
+
+# =============================================
+# cli args whose defaults come from the algo instance
+# (overlaid in Algo.load_cli_args after parsing)
+_CLI_INSTANCE_ARGS = ('sms', 'log', 'backtest', 'backfill', 'start', 'end',
+                      'data', 'output', 'continuous', 'preload_positions')
+
+
+@lru_cache(maxsize=1)
+def _build_arg_parser():
+    """ build the cli parser once per process """
+    parser = argparse.ArgumentParser(
+        description='Kinetick Algo',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--sms', default=argparse.SUPPRESS,
+                        help='Numbers to text orders', nargs='+')
+    parser.add_argument('--log', default=argparse.SUPPRESS,
+                        help='Path to store trade data')
+    parser.add_argument('--backtest', default=argparse.SUPPRESS,
+                        help='Work in Backtest mode (flag)',
+                        action='store_true')
+    parser.add_argument('--backfill', default=argparse.SUPPRESS,
+                        help='backfill bar data (flag)',
+                        action='store_true')
+    parser.add_argument('--start', default=argparse.SUPPRESS,
+                        help='Backtest start date')
+    parser.add_argument('--end', default=argparse.SUPPRESS,
+                        help='Backtest end date')
+    parser.add_argument('--data', default=argparse.SUPPRESS,
+                        help='Path to backtester CSV files')
+    parser.add_argument('--output', default=argparse.SUPPRESS,
+                        help='Path to save the recorded data')
+    parser.add_argument('--blotter',
+                        help='Log trades to this Blotter\'s Datastore')
+    parser.add_argument('--continuous', default=argparse.SUPPRESS,
+                        help='Use continuous Futures contracts (flag)',
+                        action='store_true')
+    parser.add_argument('--zerodha_user', default=os.getenv("zerodha_user"),
+                        help='Zerodha Username', required=False)
+    parser.add_argument('--zerodha_password', default=os.getenv("zerodha_password"),
+                        help='Zerodha Password', required=False)
+    parser.add_argument('--zerodha_pin', default=os.getenv("zerodha_pin"),
+                        help='Zerodha PIN', required=False)
+    parser.add_argument('--resolution', default=os.getenv("resolution") or Timeframes.MINUTE_1,
+                        help='Bar interval in terms of resolution (default=1m). '
+                             'ex. 1m, 3m, 5m, 15m, 30m, 1h, 2h, 3h, 4h, 6h, 8h, 1D',
+                        required=False)
+    parser.add_argument('--max_trades', default=os.getenv("max_trades") or 1, type=int,
+                        help='Max Active Concurrent Trades (default=1). ex. 4', required=False)
+    parser.add_argument('--initial_capital', default=os.getenv("initial_capital") or 10000, type=float,
+                        help='Initial Capital (default=10000). ex. 1200000', required=False)
+    parser.add_argument('--initial_margin', default=os.getenv("initial_margin") or 1000, type=float,
+                        help='Initial Margin (default=1000). ex. 10000', required=False)
+    parser.add_argument('--risk2reward', default=os.getenv("risk2reward") or 1, type=float,
+                        help='Risk to Reward (default=1). ex. 1.2', required=False)
+    parser.add_argument('--risk_per_trade', default=os.getenv("risk_per_trade") or 100, type=float,
+                        help='Risk per Trade (default=100), ex. 100', required=False)
+    parser.add_argument('--preload_positions',
+                        default=os.getenv("preload_positions") or argparse.SUPPRESS,
+                        help='Preload positions. Only available in live trade. ex. 4D, 1H',
+                        required=False)
+    return parser
 
 
 class Algo(Broker):
@@ -133,10 +233,24 @@ class Algo(Broker):
 
         # -----------------------------------
         # assign algo params
-        self.bars = pd.DataFrame(columns=["symbol", "symbol_group"])
-        self.ticks = pd.DataFrame(columns=["symbol", "symbol_group"])
+        # guards the tick/bar shard dicts and ring buffers: handlers
+        # mutate them from the stream thread while the stale-tick
+        # timer (and --threads strategies) materialize them
+        self._frames_lock = threading.Lock()
+        self._bar_shards = {}  # per-symbol bar frames (thread-local writes)
+        self._bars_dirty = False  # shards have rows not yet in the frame
+        self.bars = _empty_frame(_CSV_BAR_DTYPES)
+        self.ticks = _empty_frame(_CSV_TICK_DTYPES)
+        self._tick_buffers = {}  # per-symbol ring buffers (time-based bars)
+        self._tick_shards = {}  # per-symbol tick frames (tick/volume bars)
+        self._seen_tick_symbols = set()  # symbols/groups with ticks in window
+        self._seen_tick_groups = set()
+        self._ticks_dirty = False  # ring buffers have rows not yet in the frame
+        self._bar_accums = {}  # per-symbol progress toward the next tick/volume bar
+        self._polars_warned = False  # one warning per run on fallback
         self.quotes = {}
         self.books = {}
+        self._top_of_book = {}  # per-symbol top-of-book scalars
         self.tick_count = 0
         self.tick_bar_count = 0
         self.bar_count = 0
@@ -147,6 +261,11 @@ class Algo(Broker):
             self.tick_window = 1000
         self.bar_window = bar_window if bar_window > 0 else 100
         self.resolution = Timeframes.timeframe_to_resolution(resolution)
+        # resolve these once - used on every run/tick
+        self._resolution_tf = Timeframes.to_timeframe(self.resolution)
+        self._is_tick_resolution = self.resolution[-1] in ("S", "K", "V")
+        self._resolution_window = utils._resolution_periods(
+            self.resolution, default=1)
         self.timezone = timezone
         self.preload = preload
         self.preload_positions = self.args['preload_positions']
@@ -204,10 +323,17 @@ class Algo(Broker):
                          zerodha_pin=self.args['zerodha_pin'])
 
         # -----------------------------------
-        # signal collector
-        self.signals = {}
-        for sym in self.symbols:
-            self.signals[sym] = pd.DataFrame()
+        # signal collector (per-symbol numpy buffers)
+        self.signals = {sym: np.empty(0) for sym in self.symbols}
+
+        # -----------------------------------
+        # prebuilt categorical dtypes - casting with known categories
+        # skips re-hashing the category list on every astype
+        self._sym_dtype = pd.CategoricalDtype(sorted(self.symbols))
+        self._group_dtype = pd.CategoricalDtype(
+            sorted({utils.gen_symbol_group(sym) for sym in self.symbols}))
+        self._class_dtype = pd.CategoricalDtype(
+            sorted({utils.gen_asset_class(sym) for sym in self.symbols}))
 
         # -----------------------------------
         # initialize output file
@@ -217,7 +343,7 @@ class Algo(Broker):
 
         # ---------------------------------------
         # add stale ticks for more accurate time--based bars
-        if not self.backtest and self.resolution[-1] not in ("S", "K", "V"):
+        if not self.backtest and not self._is_tick_resolution:
             self.bar_timer = asynctools.RecurringTask(
                 self.add_stale_tick, interval_sec=1, init_sec=1, daemon=True)
 
@@ -225,27 +351,80 @@ class Algo(Broker):
         # be aware of thread count
         self.threads = asynctools.multitasking.getPool(__name__)['threads']
 
+    # ---------------------------------------
+    @property
+    def ticks(self):
+        # materialize the ring buffers into a frame only when read.
+        # the lock keeps the handlers from appending (or adding a
+        # symbol) while the buffers are being iterated
+        if self._ticks_dirty:
+            with self._frames_lock:
+                rows = [row for buf in self._tick_buffers.values()
+                        for row in buf]
+                rows += [df for df in self._tick_shards.values()
+                         if not df.empty]
+                if rows:
+                    self._ticks = pd.concat(rows, sort=True).sort_index()
+                self._ticks_dirty = False
+        return self._ticks
+
+    @ticks.setter
+    def ticks(self, value):
+        with self._frames_lock:
+            self._ticks = value
+            self._ticks_dirty = False
+
+    # ---------------------------------------
+    @property
+    def bars(self):
+        # combine the per-symbol shards only when read (cached); the
+        # lock keeps _base_bar_handler from inserting a shard while
+        # the dict is being iterated
+        if self._bars_dirty:
+            with self._frames_lock:
+                shards = [df for df in self._bar_shards.values()
+                          if not df.empty]
+                if shards:
+                    self._bars = pd.concat(shards, sort=False).sort_index()
+                self._bars_dirty = False
+        return self._bars
+
+    @bars.setter
+    def bars(self, value):
+        with self._frames_lock:
+            self._bars = value
+            self._bar_shards = {} if value.empty else {
+                symbol: df for symbol, df in
+                value.groupby('symbol', sort=False, observed=True)}
+            # symbols/groups with bars in window (O(1) existence checks)
+            self._seen_bar_symbols = set(self._bar_shards.keys())
+            self._seen_bar_groups = set() if value.empty else set(
+                value['symbol_group'].unique())
+            self._bars_dirty = False
+
     # ---------------------------------------
     def add_stale_tick(self):
-        ticks = self.ticks.copy()
-        if self.ticks.empty:
+        ticks = self.ticks  # shallow reference - nothing below mutates it
+        if ticks.empty:
             return
 
         last_tick_sec = float(utils.datetime64_to_datetime(
             ticks.index.values[-1]).strftime('%M.%S'))
 
-        for sym in list(self.ticks["symbol"].unique()):
-            tick = ticks[ticks['symbol'] ==
-                         sym][-5:].to_dict(orient='records')[-1]
-            tick['timestamp'] = datetime.utcnow()
+        now = datetime.utcnow()
+        if last_tick_sec == float(now.strftime("%M.%S")):
+            return
 
-            if last_tick_sec != float(tick['timestamp'].strftime("%M.%S")):
-                tick = pd.DataFrame(index=[0], data=tick)
-                tick.set_index('timestamp', inplace=True)
-                tick = utils.set_timezone(tick, tz=self.timezone)
-                tick.loc[:, 'lastsize'] = 0  # no real size
+        # last tick per symbol in a single pass; reuse the row slice
+        # as-is instead of round-tripping through to_dict + DataFrame
+        last_ticks = ticks.groupby('symbol', sort=False, observed=True).tail(1)
+        for i in range(len(last_ticks)):
+            tick = last_ticks.iloc[[i]].copy()
+            tick.index = pd.DatetimeIndex([now])
+            tick = utils.set_timezone(tick, tz=self.timezone)
+            tick['lastsize'] = 0  # no real size
 
-                self._tick_handler(tick, stale_tick=True)
+            self._tick_handler(tick, stale_tick=True)
 
     # ---------------------------------------
     def load_cli_args(self):
@@ -255,60 +434,15 @@ class Algo(Broker):
         :Retruns: dict
             a dict of any non-default args passed on the command-line.
         """
-        parser = argparse.ArgumentParser(
-            description='Kinetick Algo',
-            formatter_class=argparse.ArgumentDefaultsHelpFormatter)
-        parser.add_argument('--sms', default=self.args["sms"],
-                            help='Numbers to text orders', nargs='+')
-        parser.add_argument('--log', default=self.args["log"],
-                            help='Path to store trade data')
-        parser.add_argument('--backtest', default=self.args["backtest"],
-                            help='Work in Backtest mode (flag)',
-                            action='store_true')
-        parser.add_argument('--backfill', default=self.args["backfill"],
-                            help='backfill bar data (flag)',
-                            action='store_true')
-        parser.add_argument('--start', default=self.args["start"],
-                            help='Backtest start date')
-        parser.add_argument('--end', default=self.args["end"],
-                            help='Backtest end date')
-        parser.add_argument('--data', default=self.args["data"],
-                            help='Path to backtester CSV files')
-        parser.add_argument('--output', default=self.args["output"],
-                            help='Path to save the recorded data')
-        parser.add_argument('--blotter',
-                            help='Log trades to this Blotter\'s Datastore')
-        parser.add_argument('--continuous', default=self.args["continuous"],
-                            help='Use continuous Futures contracts (flag)',
-                            action='store_true')
-        parser.add_argument('--zerodha_user', default=os.getenv("zerodha_user"),
-                            help='Zerodha Username', required=False)
-        parser.add_argument('--zerodha_password', default=os.getenv("zerodha_password"),
-                            help='Zerodha Password', required=False)
-        parser.add_argument('--zerodha_pin', default=os.getenv("zerodha_pin"),
-                            help='Zerodha PIN', required=False)
-        parser.add_argument('--resolution', default=os.getenv("resolution") or Timeframes.MINUTE_1,
-                            help='Bar interval in terms of resolution (default=1m). '
-                                 'ex. 1m, 3m, 5m, 15m, 30m, 1h, 2h, 3h, 4h, 6h, 8h, 1D',
-                            required=False)
-        parser.add_argument('--max_trades', default=os.getenv("max_trades") or 1, type=int,
-                            help='Max Active Concurrent Trades (default=1). ex. 4', required=False)
-        parser.add_argument('--initial_capital', default=os.getenv("initial_capital") or 10000, type=float,
-                            help='Initial Capital (default=10000). ex. 1200000', required=False)
-        parser.add_argument('--initial_margin', default=os.getenv("initial_margin") or 1000, type=float,
-                            help='Initial Margin (default=1000). ex. 10000', required=False)
-        parser.add_argument('--risk2reward', default=os.getenv("risk2reward") or 1, type=float,
-                            help='Risk to Reward (default=1). ex. 1.2', required=False)
-        parser.add_argument('--risk_per_trade', default=os.getenv("risk_per_trade") or 100, type=float,
-                            help='Risk per Trade (default=100), ex. 100', required=False)
-        parser.add_argument('--preload_positions',
-                            default=os.getenv("preload_positions") or self.args["preload_positions"]
-                            if 'preload_positions' in self.args else None,
-                            help='Preload positions. Only available in live trade. ex. 4D, 1H', required=False)
-
-        cmd_args, _ = parser.parse_known_args()
+        cmd_args, _ = _build_arg_parser().parse_known_args()
         args = {arg: val for arg, val in vars(
             cmd_args).items()}
+
+        # instance-dependent defaults are suppressed in the shared parser;
+        # overlay them here for args not given on the command line
+        for arg in _CLI_INSTANCE_ARGS:
+            if arg not in args:
+                args[arg] = self.args[arg] if arg in self.args else None
         return args
 
     # ---------------------------------------
@@ -324,7 +458,34 @@ class Algo(Broker):
 
         # get history from csv dir
         if self.backtest and self.backtest_csv:
-            kind = "TICK" if self.resolution[-1] in ("S", "K", "V") else "BAR"
+            kind = "TICK" if self._is_tick_resolution else "BAR"
+
+            # use pyarrow's multi-threaded csv reader when available
+            # (plain pandas otherwise)
+            try:
+                import pyarrow as pa
+                from pyarrow import csv as pa_csv
+            except ImportError:
+                pa_csv = None
+
+            # stream each file in chunks and apply the backtest start
+            # filter per chunk, so rows outside the requested range are
+            # never accumulated in memory
+            start_dt = pd.to_datetime(self.backtest_start)
+
+            csv_dtypes = _CSV_TICK_DTYPES if kind == "TICK" \
+                else _CSV_BAR_DTYPES
+            if pa_csv is not None:
+                convert_opts = pa_csv.ConvertOptions(
+                    column_types={col: pa.float32() if dt == 'float32'
+                                  else pa.int32()
+                                  for col, dt in csv_dtypes.items()
+                                  if dt != 'category'},
+                    auto_dict_encode=True)
+
+            def _filter_chunk(chunk):
+                return chunk[pd.to_datetime(chunk['datetime']) >= start_dt]
+
             dfs = []
             for symbol in self.symbols:
                 file = "%s/%s.%s.csv" % (self.backtest_csv, symbol, kind)
@@ -334,7 +495,19 @@ class Algo(Broker):
                         symbol, file)
                     sys.exit(0)
                 try:
-                    df = pd.read_csv(file)
+                    if pa_csv is not None:
+                        reader = pa_csv.open_csv(
+                            file,
+                            read_options=pa_csv.ReadOptions(block_size=8 << 20),
+                            convert_options=convert_opts)
+                        chunks = [_filter_chunk(batch.to_pandas())
+                                  for batch in reader]
+                    else:
+                        chunks = [_filter_chunk(chunk) for chunk in
+                                  pd.read_csv(file, chunksize=65536,
+                                              dtype=csv_dtypes)]
+                    df = pd.concat(chunks, sort=False) \
+                        if chunks else pd.DataFrame()
                     if "expiry" not in df.columns:
                         df.loc[:, "expiry"] = nan
 
@@ -361,7 +534,9 @@ class Algo(Broker):
                 tz=self.timezone,
                 continuous=self.continuous
             )
-            history = history[history.index >= self.backtest_start]
+            # index is sorted coming out of prepare_history, so label
+            # slicing (binary search) beats a full boolean mask
+            history = history.loc[self.backtest_start:]
 
         elif not self.blotter_args["dbskip"] and (
                 self.backtest or self.preload):
@@ -374,7 +549,7 @@ class Algo(Broker):
                 symbols=self.symbols,
                 start=start,
                 end=end,
-                resolution=Timeframes.to_timeframe(self.resolution),
+                resolution=self._resolution_tf,
                 tz=self.timezone,
                 continuous=self.continuous
             )
@@ -387,18 +562,38 @@ class Algo(Broker):
 
                 # call the back fill
                 self.blotter.backfill(data=history,
-                                      resolution=Timeframes.to_timeframe(self.resolution),
+                                      resolution=self._resolution_tf,
                                       start=start, end=end)
 
-                # re-get history from db
-                history = self.blotter.history(
-                    symbols=self.symbols,
-                    start=start,
-                    end=end,
-                    resolution=Timeframes.to_timeframe(self.resolution),
-                    tz=self.timezone,
-                    continuous=self.continuous
-                )
+                # refresh from the last known bar instead of re-reading
+                # the whole range - only the backfilled delta is new
+                if history.empty:
+                    history = self.blotter.history(
+                        symbols=self.symbols,
+                        start=start,
+                        end=end,
+                        resolution=self._resolution_tf,
+                        tz=self.timezone,
+                        continuous=self.continuous
+                    )
+                else:
+                    # history() renders datetimes as wall-clock strings
+                    # against the naive-UTC datetimes in mongo, so hand
+                    # it the cutoff in UTC - the index is localized to
+                    # self.timezone
+                    delta = self.blotter.history(
+                        symbols=self.symbols,
+                        start=history.index[-1].tz_convert('UTC'),
+                        end=end,
+                        resolution=self._resolution_tf,
+                        tz=self.timezone,
+                        continuous=self.continuous
+                    )
+                    history = pd.concat([history, delta], sort=True)
+                    keys = pd.MultiIndex.from_arrays(
+                        [history.index, history['symbol']])
+                    history = history[~keys.duplicated(keep='last')]
+                    history.sort_index(inplace=True)
 
                 # take our connection back :)
                 self.blotter.connection = None
@@ -408,6 +603,18 @@ class Algo(Broker):
             history['symbol'] = history['symbol'].astype('category')
             history['symbol_group'] = history['symbol_group'].astype('category')
             history['asset_class'] = history['asset_class'].astype('category')
+
+            # market data doesn't need 64-bit - halve the bytes every
+            # downstream operation has to move
+            for col in ('open', 'high', 'low', 'close', 'last'):
+                if col in history.columns:
+                    history[col] = pd.to_numeric(
+                        history[col], downcast='float')
+            for col in ('volume', 'lastsize', 'bidsize', 'asksize'):
+                if col in history.columns:
+                    history[col] = pd.to_numeric(
+                        history[col], downcast='integer')
+
             history = history.loc[history['volume'] > 0]
 
         if self.backtest:
@@ -415,8 +622,8 @@ class Algo(Broker):
             self.on_start()
 
             # drip history
-            drip_handler = self._tick_handler if self.resolution[-1] in (
-                "S", "K", "V") else self._bar_handler
+            drip_handler = self._tick_handler \
+                if self._is_tick_resolution else self._bar_handler
             self.blotter.drip(history, drip_handler)
 
         else:
@@ -641,12 +848,17 @@ class Algo(Broker):
             best_price = kwargs['best_price'] if 'best_price' in kwargs else False
 
             if best_price is True and limit_price > 0:
-                instrument = self.get_instrument(symbol)
-                order_book = instrument.get_orderbook()
-                running_price = float(order_book['bid'][0]) if txn_type.upper() != "BUY" else float(
-                    order_book['ask'][0])
-                running_size = float(order_book['bidsize'][0]) if txn_type.upper() != "BUY" else float(
-                    order_book['asksize'][0])
+                is_buy = txn_type.upper() == "BUY"
+                top = self._top_of_book.get(symbol)
+                if top is None:
+                    instrument = self.get_instrument(symbol)
+                    order_book = instrument.get_orderbook()
+                    top = (float(order_book['bid'][0]),
+                           float(order_book['ask'][0]),
+                           float(order_book['bidsize'][0]),
+                           float(order_book['asksize'][0]))
+                running_price = top[1] if is_buy else top[0]
+                running_size = top[3] if is_buy else top[2]
 
                 if running_price > 0 and running_size >= abs(quantity):
                     if txn_type.upper() != "BUY":
@@ -705,8 +917,16 @@ class Algo(Broker):
     # ---------------------------------------
     @staticmethod
     def _caller(caller):
-        stack = [x[3] for x in inspect.stack()][1:-1]
-        return caller in stack
+        # walk raw frames - inspect.stack() materializes source context
+        # for every frame just to answer a name-membership question.
+        # accepts a tuple so one walk can answer for several callers
+        names = (caller,) if isinstance(caller, str) else caller
+        frame = sys._getframe(1)
+        while frame is not None:
+            if frame.f_code.co_name in names:
+                return True
+            frame = frame.f_back
+        return False
 
     # ---------------------------------------
     @asynctools.multitasking.task
@@ -715,6 +935,14 @@ class Algo(Broker):
         del book['symbol']
         del book['kind']
 
+        # cache top-of-book scalars for the order() best-price path
+        try:
+            self._top_of_book[symbol] = (
+                float(book['bid'][0]), float(book['ask'][0]),
+                float(book['bidsize'][0]), float(book['asksize'][0]))
+        except (KeyError, IndexError, TypeError, ValueError):
+            pass
+
         self.books[symbol] = book
         self.on_orderbook(self.get_instrument(symbol))
 
@@ -727,33 +955,50 @@ class Algo(Broker):
 
     # ---------------------------------------
     @staticmethod
-    def _get_window_per_symbol(df, window):
-        # truncate tick window per symbol
-        dfs = []
-        for sym in list(df["symbol"].unique()):
-            dfs.append(df[df['symbol'] == sym][-window:])
-        return pd.concat(dfs, sort=True).sort_index()
+    def _const_category(value, length, dtype):
+        # constant column stamped straight from its code - no per-row
+        # string hashing (falls back for symbols outside the dtype)
+        try:
+            code = dtype.categories.get_loc(value)
+        except KeyError:
+            return pd.Categorical([value] * length)
+        return pd.Categorical.from_codes(
+            np.full(length, code, dtype=np.int64), dtype=dtype)
 
     # ---------------------------------------
     @staticmethod
-    def _thread_safe_merge(symbol, basedata, newdata):
-        data = newdata
-        if "symbol" in basedata.columns:
-            data = pd.concat(
-                [basedata[basedata['symbol'] != symbol], data], sort=True)
-
-        data.loc[:, '_idx_'] = data.index
-        data = data.drop_duplicates(
-            subset=['_idx_', 'symbol', 'symbol_group', 'asset_class'],
-            keep='last')
-        data = data.drop('_idx_', axis=1)
-        data = data.sort_index()
+    def _as_category(series, dtype):
+        # no-op when the series is already categorical - no re-hash of
+        # the category list
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            return series
+        # reuse the prebuilt dtype when it covers the values (astype
+        # with unknown values would silently produce NaNs)
+        if series.isin(dtype.categories).all():
+            return series.astype(dtype)
+        return series.astype('category')
 
-        try:
-            return data.dropna(subset=[
-                'open', 'high', 'low', 'close', 'volume'])
-        except Exception as e:
-            return data
+    # ---------------------------------------
+    @staticmethod
+    def _get_window_per_symbol(df, window):
+        # truncate window per symbol - numpy segment boundaries instead
+        # of building a GroupBy object per call
+        symbols = df['symbol']
+        if isinstance(symbols.dtype, pd.CategoricalDtype):
+            symbols = symbols.cat.codes
+        symbols = symbols.to_numpy()
+
+        # stable sort keeps frame (time) order within each symbol
+        order = np.argsort(symbols, kind='stable')
+        sorted_syms = symbols[order]
+        starts = np.flatnonzero(
+            np.r_[True, sorted_syms[1:] != sorted_syms[:-1]])
+        ends = np.r_[starts[1:], len(sorted_syms)]
+
+        keep = np.concatenate(
+            [order[max(start, end - window):end]
+             for start, end in zip(starts, ends)]) if len(starts) else order
+        return df.iloc[keep].sort_index()
 
     # ---------------------------------------
     @asynctools.multitasking.task
@@ -761,57 +1006,80 @@ class Algo(Broker):
         # self._cancel_expired_pending_orders() TODO
 
         # tick symbol
-        symbol = tick['symbol'].values
-        if len(symbol) == 0:
+        if tick.empty:
             return
-        symbol = symbol[0]
-        self.last_price[symbol] = float(tick['last'].values[0])
+        symbol = tick['symbol'].iat[0]
+        self.last_price[symbol] = float(tick['last'].iat[0])
 
-        # work on copy
-        self_ticks = self.ticks.copy()
+        self._seen_tick_symbols.add(symbol)
+        if 'symbol_group' in tick.columns:
+            self._seen_tick_groups.add(tick['symbol_group'].iat[0])
 
         # initial value
         if self.record_ts is None:
             self.record_ts = tick.index[0]
 
-        if self.resolution[-1] not in ("S", "K", "V"):
-            if self.threads == 0:
-                self.ticks = self._update_window(
-                    self.ticks, tick, window=self.tick_window)
-            else:
-                self_ticks = self._update_window(
-                    self_ticks, tick, window=self.tick_window)
-                self.ticks = self._thread_safe_merge(
-                    symbol, self.ticks, self_ticks)  # assign back
+        if not self._is_tick_resolution:
+            # O(1) append into a bounded per-symbol ring buffer -
+            # no full-frame copy/concat/drop_duplicates on the hot path
+            with self._frames_lock:
+                buffer = self._tick_buffers.get(symbol)
+                if buffer is None:
+                    buffer = deque(maxlen=self.tick_window)
+                    self._tick_buffers[symbol] = buffer
+                buffer.append(tick)
+                self._ticks_dirty = True  # materialized lazily by the property
         else:
-            self.ticks = self._update_window(self.ticks, tick)
-            # bars = utils.resample(self.ticks, self.resolution)
-            bars = utils.resample(
-                self.ticks, self.resolution, tz=self.timezone)
-
-            if len(bars.index) > self.tick_bar_count > 0 or stale_tick:
-                self.record_ts = tick.index[0]
-                self._base_bar_handler(bars[bars['symbol'] == symbol][-1:])
-
-                window = int(
-                    "".join([s for s in self.resolution if s.isdigit()]))
-                if self.threads == 0:
-                    self.ticks = self._get_window_per_symbol(
-                        self.ticks, window)
-                else:
-                    self_ticks = self._get_window_per_symbol(
-                        self_ticks, window)
-                    self.ticks = self._thread_safe_merge(
-                        symbol, self.ticks, self_ticks)  # assign back
-
-            self.tick_bar_count = len(bars.index)
-
-            # record non time-based bars
-            self.record(bars[-1:])
+            # per-symbol shard - concurrent handlers write disjoint
+            # dict keys; the ticks property re-assembles the full
+            # frame lazily when something reads it
+            with self._frames_lock:
+                shard = self._update_window(self._tick_shards.get(symbol),
+                                            tick, single_symbol=True)
+                self._tick_shards[symbol] = shard
+                self._ticks_dirty = True
+
+            # O(1) boundary pre-check: resampling the whole tick buffer
+            # on every tick is wasted work unless this tick can actually
+            # complete a bar. track per-symbol progress (tick count for
+            # K, cumulative volume for V) and carry the remainder so
+            # crossings line up with resample's cumulative grouping.
+            # time-based (S) boundaries depend on the clock, so those
+            # always resample.
+            boundary = True
+            if self.resolution[-1] in ("K", "V"):
+                step = int(tick['lastsize'].iat[0]) \
+                    if self.resolution[-1] == "V" else 1
+                accum = self._bar_accums.get(symbol, 0) + step
+                boundary = accum >= self._resolution_window
+                self._bar_accums[symbol] = \
+                    accum - self._resolution_window if boundary else accum
+
+            if boundary or stale_tick:
+                # bars = utils.resample(self.ticks, self.resolution)
+                bars = utils.resample(
+                    self.ticks, self.resolution, tz=self.timezone)
+
+                if len(bars.index) > self.tick_bar_count > 0 or stale_tick:
+                    self.record_ts = tick.index[0]
+                    self._base_bar_handler(bars[bars['symbol'] == symbol][-1:])
+
+                    # trim only this symbol's shard at its bar close -
+                    # no cross-thread merge needed
+                    window = self._resolution_window
+                    with self._frames_lock:
+                        self._tick_shards[symbol] = shard.iloc[-window:]
+                        self._ticks_dirty = True
+
+                self.tick_bar_count = len(bars.index)
+
+                # record non time-based bars
+                self.record(bars[-1:])
 
         if not stale_tick:
-            if self.ticks[(self.ticks['symbol'] == symbol) | (
-                    self.ticks['symbol_group'] == symbol)].empty:
+            # O(1) membership instead of a boolean scan of the window
+            if symbol not in self._seen_tick_symbols and \
+                    symbol not in self._seen_tick_groups:
                 return
             tick_instrument = self.get_instrument(tick)
             if tick_instrument:
@@ -821,64 +1089,70 @@ class Algo(Broker):
     def _base_bar_handler(self, bar):
         """ non threaded bar handler (called by threaded _tick_handler) """
         # bar symbol
-        symbol = bar['symbol'].values
-        if len(symbol) == 0:
+        if bar.empty:
             return
-        symbol = symbol[0]
-        self_bars = self.bars.copy()  # work on copy
+        symbol = bar['symbol'].iat[0]
 
         is_tick_or_volume_bar = False
         handle_bar = True
 
-        if self.resolution[-1] in ("S", "K", "V"):
+        if self._is_tick_resolution:
             is_tick_or_volume_bar = True
-            handle_bar = self._caller("_tick_handler")
-
-        # drip is also ok
-        handle_bar = handle_bar or self._caller("drip")
-
-        if is_tick_or_volume_bar:
-            # just add a bar (used by tick bar bandler)
-            if self.threads == 0:
-                self.bars = self._update_window(self.bars, bar,
-                                                window=self.bar_window)
-            else:
-                self_bars = self._update_window(self_bars, bar,
-                                                window=self.bar_window)
-        else:
-            # add the bar and resample to resolution
-            if self.threads == 0:
-                self.bars = self._update_window(self.bars, bar,
+            # drip is also ok - one stack walk answers for both callers
+            handle_bar = self._caller(("_tick_handler", "drip"))
+
+        # each symbol lives in its own shard, so concurrent handlers
+        # never rebuild the combined frame - the bars property
+        # re-assembles it lazily on the next read (under the same
+        # lock, so the shard dict never changes size mid-iteration)
+        with self._frames_lock:
+            shard = self._bar_shards.get(symbol)
+            first_bar = shard is None
+
+            if is_tick_or_volume_bar:
+                # just add a bar (used by tick bar bandler); when the
+                # same bar is still forming, overwrite its row in
+                # place instead of a concat + dedup pass
+                if shard is not None and len(shard.index) \
+                        and shard.index[-1] == bar.index[0]:
+                    shard.iloc[-1] = bar.iloc[0]
+                else:
+                    shard = self._update_window(shard, bar,
                                                 window=self.bar_window,
-                                                resolution=self.resolution)
+                                                single_symbol=True)
             else:
-                self_bars = self._update_window(self_bars, bar,
-                                                window=self.bar_window,
-                                                resolution=self.resolution)
-
-        # assign new data to self.bars if threaded
-        if self.threads > 0:
-            self.bars = self._thread_safe_merge(symbol, self.bars, self_bars)
-
-        # optimize pandas
-        if len(self.bars) == 1:
-            self.bars['symbol'] = self.bars['symbol'].astype('category')
-            self.bars['symbol_group'] = self.bars['symbol_group'].astype('category')
-            self.bars['asset_class'] = self.bars['asset_class'].astype('category')
-
-        # new bar?
-        hash_string = bar[:1]['symbol'].to_string().translate(
-            str.maketrans({key: None for key in "\n -:+"}))
-        this_bar_hash = abs(hash(hash_string)) % (10 ** 8)
-
-        newbar = True
-        if symbol in self.bar_hashes.keys():
-            newbar = self.bar_hashes[symbol] != this_bar_hash
-        self.bar_hashes[symbol] = this_bar_hash
+                # add the bar and resample to resolution
+                shard = self._update_window(shard, bar,
+                                            window=self.bar_window,
+                                            resolution=self.resolution,
+                                            single_symbol=True)
+
+            # optimize pandas
+            if first_bar:
+                shard['symbol'] = self._as_category(
+                    shard['symbol'], self._sym_dtype)
+                shard['symbol_group'] = self._as_category(
+                    shard['symbol_group'], self._group_dtype)
+                shard['asset_class'] = self._as_category(
+                    shard['asset_class'], self._class_dtype)
+
+            self._bar_shards[symbol] = shard
+            self._seen_bar_symbols.add(symbol)
+            self._seen_bar_groups.add(str(bar['symbol_group'].iat[0]))
+            self._bars_dirty = True
+
+        # new bar? (keyed on the bar timestamp - the old string-hash of
+        # the rendered row was just a slow proxy for it). single dict
+        # probe: a missing symbol compares unequal, i.e. new
+        this_bar_ts = bar.index.values[0]
+        newbar = self.bar_hashes.get(symbol) != this_bar_ts
+        self.bar_hashes[symbol] = this_bar_ts
 
         if newbar and handle_bar:
-            if self.bars[(self.bars['symbol'] == symbol) | (
-                    self.bars['symbol_group'] == symbol)].empty:
+            # set membership replaces the old two-column boolean scan
+            # over the full window
+            if symbol not in self._seen_bar_symbols \
+                    and symbol not in self._seen_bar_groups:
                 return
             bar_instrument = self.get_instrument(symbol)
             if bar_instrument:
@@ -894,55 +1168,129 @@ class Algo(Broker):
         self._base_bar_handler(bar)
 
     # ---------------------------------------
-    def _update_window(self, df, data, window=None, resolution=None):
+    def _update_window(self, df, data, window=None, resolution=None,
+                       single_symbol=False):
         if df is None:
             df = data
         else:
-            df = df.append(data, sort=True)
-            df.loc[:, '_idx_'] = df.index
-            df.drop_duplicates(
-                subset=['_idx_', 'symbol', 'symbol_group', 'asset_class'],
-                keep='last', inplace=True)
-            df.drop('_idx_', axis=1, inplace=True)
+            # pd.concat - DataFrame.append re-copied the whole window
+            # per call (and is gone from newer pandas); dedup follows
+            # below for both paths
+            df = pd.concat([df, data], sort=True)
 
         # resample
         if resolution:
-            tz = str(df.index.tz)
-            # try:
-            #     tz = str(df.index.tz)
-            # except Exception as e:
-            #     tz = None
-            df = utils.resample(df, resolution=resolution, tz=tz, sync_last_timestamp=False)
+            # tzinfo or None - stringifying a naive index gave the
+            # literal "None", which resample's finalizer would try
+            # to tz_convert to
+            tz = df.index.tz
+            # resample trims to the window per symbol while the data
+            # is still grouped - no second pass over the result
+            resampled = None
+            if pl is not None and set(df.columns) <= _PLAIN_BAR_COLS:
+                try:
+                    resampled = self._resample_polars(
+                        df, resolution, tz, window=window)
+                except Exception as e:
+                    resampled = None
+                    # warn once - a permanently-failing fast path
+                    # shouldn't hide behind the fallback
+                    if not self._polars_warned:
+                        self._polars_warned = True
+                        self.log_algo.warning(
+                            "polars resample failed, using pandas: %s", e)
+            if resampled is None:
+                resampled = utils.resample(df, resolution=resolution, tz=tz,
+                                           sync_last_timestamp=False,
+                                           max_bars_per_symbol=window)
+            df = resampled
+            window = None
 
         else:
             # remove duplicates rows
             # (handled by resample if resolution is provided)
-            df.loc[:, '_idx_'] = df.index
-            df.drop_duplicates(
-                subset=['_idx_', 'symbol', 'symbol_group', 'asset_class'],
-                keep='last', inplace=True)
-            df.drop('_idx_', axis=1, inplace=True)
+            if single_symbol:
+                # per-symbol shard - the timestamp alone is the key
+                mask = df.index.duplicated(keep='last')
+            else:
+                keys = pd.MultiIndex.from_arrays(
+                    [df.index, df['symbol'], df['symbol_group'],
+                     df['asset_class']])
+                mask = keys.duplicated(keep='last')
+            if mask.any():
+                df = df.loc[~mask]
 
         # return
         if window is None:
             return df
 
-        # return df[-window:]
+        if single_symbol:
+            # positional tail - no groupby needed on a one-symbol frame
+            return df.iloc[-window:]
         return self._get_window_per_symbol(df, window)
 
+    # ---------------------------------------
+    @staticmethod
+    def _resample_polars(df, resolution, tz, window=None):
+        """ plain-ohlcv resample on polars' lazy engine """
+        # pandas offset aliases -> polars durations (1T -> 1m, ...)
+        every = resolution.replace(
+            "T", "m").replace("H", "h").replace("D", "d").replace("W", "w")
+
+        # reset_index(names=...) needs pandas >= 1.5; the repo pins
+        # 1.3, so splice the index in as a column by hand
+        pdf = df.copy(deep=False)
+        pdf.insert(0, 'datetime', pdf.index)
+        pdf.reset_index(drop=True, inplace=True)
+        out = (
+            pl.from_pandas(pdf, rechunk=False).lazy()
+            .sort('datetime')
+            .group_by_dynamic('datetime', every=every, group_by='symbol')
+            .agg([pl.col('open').first(), pl.col('high').max(),
+                  pl.col('low').min(), pl.col('close').last(),
+                  pl.col('volume').sum(),
+                  pl.col('symbol_group').last(),
+                  pl.col('asset_class').last()])
+            .collect()
+            .to_pandas()
+        )
+
+        out.set_index('datetime', inplace=True)
+        if tz is not None:
+            if out.index.tz is None:
+                out.index = out.index.tz_localize('UTC')
+            out.index = out.index.tz_convert(tz)
+        out.dropna(subset=['open', 'high', 'low', 'close', 'volume'],
+                   inplace=True)
+        out['volume'] = out['volume'].astype(int)
+        out.sort_index(inplace=True)
+
+        if window is not None:
+            out = out.groupby(
+                'symbol', sort=False, observed=True).tail(window).sort_index()
+        return out
+
     # ---------------------------------------
     # signal logging methods
     # ---------------------------------------
     def _add_signal_history(self, df, symbol):
         """ Initilize signal history """
-        if symbol not in self.signals.keys() or len(self.signals[symbol]) == 0:
-            self.signals[symbol] = [nan] * len(df.index)
+        window = len(df.index)
+        buf = self.signals.get(symbol)
+        if buf is None or len(buf) == 0:
+            buf = np.full(window, np.nan)
         else:
-            self.signals[symbol].append(nan)
-
-        self.signals[symbol] = self.signals[symbol][-len(df.index):]
-        signal_count = len(self.signals[symbol])
-        df.loc[-signal_count:, 'signal'] = self.signals[symbol][-signal_count:]
+            buf = np.append(buf, np.nan)[-window:]
+        self.signals[symbol] = buf
+
+        # single vectorized assignment, front-padded if the signal
+        # history is still shorter than the bar window
+        if len(buf) < window:
+            padded = np.full(window, np.nan)
+            padded[-len(buf):] = buf
+            df['signal'] = padded
+        else:
+            df['signal'] = buf
 
         return df
 
@@ -968,21 +1316,25 @@ class Algo(Broker):
         bars = self.broker.get_bars(
             tickerId=self.broker.tickerId(symbol),
             lookback=lookback,
-            interval='m' + str(Timeframes.timeframe_to_minutes(Timeframes.to_timeframe(self.resolution)))
+            interval='m' + str(Timeframes.timeframe_to_minutes(self._resolution_tf))
         )
-        bars['symbol'] = symbol
-        bars["symbol_group"] = utils.gen_symbol_group(symbol)
-        bars["asset_class"] = utils.gen_asset_class(symbol)
-
-        bars["datetime"] = bars.index
-
-        bars.set_index('datetime', inplace=True)
-        bars.index = pd.to_datetime(bars.index, utc=True)
-
-        try:
-            bars.index = bars.index.tz_convert(tz=self.timezone)
-        except Exception as e:
-            bars.index = bars.index.tz_localize('UTC').tz_convert(tz=self.timezone)
+        # stamp the constant columns as category codes - one int fill
+        # per column instead of hashing the string on every row
+        length = len(bars.index)
+        bars['symbol'] = self._const_category(
+            symbol, length, self._sym_dtype)
+        bars["symbol_group"] = self._const_category(
+            utils.gen_symbol_group(symbol), length, self._group_dtype)
+        bars["asset_class"] = self._const_category(
+            utils.gen_asset_class(symbol), length, self._class_dtype)
+
+        # detect tz once instead of paying an exception per miss, and
+        # skip the redundant set_index/re-parse round trip
+        idx = pd.to_datetime(bars.index)
+        if idx.tz is None:
+            idx = idx.tz_localize('UTC')
+        bars.index = idx.tz_convert(self.timezone)
+        bars.index.name = 'datetime'
 
         # add options columns
         df = utils.force_options_columns(bars)
@@ -990,14 +1342,20 @@ class Algo(Broker):
         return bars
 
     def load_positions(self, start):
-        for pos in Position.find(algo=self.name, _active=True, datetime__gt=start):
-            if not PositionType.is_overnight_position(pos.variety):
-                continue
+        # overnight filter runs in mongo; instruments registered in one
+        # batch instead of an add_instruments rebuild per position
+        positions = Position.find(algo=self.name, _active=True,
+                                  datetime__gt=start,
+                                  _variety__iexact=PositionType.CNC)
+        instruments = []
+        for pos in positions:
             instrument = self.get_instrument(pos.symbol)
             instrument.set_position(pos)
-            self.add_instruments([instrument])
+            instruments.append(instrument)
             try:
                 self.risk_assessor.enter_position(pos)
             except Exception as e:
                 self.log_algo.warning(
                     "Preloaded %s position exceed current risk parameters. %s", pos.symbol, e)
+        if instruments:
+            self.add_instruments(instruments)
@@ -21,16 +21,21 @@
 #
 import argparse
 import atexit
+import csv
+import hashlib
+import io
 import json
 import logging
 import os
 import pickle
+import queue
+import threading
 
+import fcntl
 import sys
 import tempfile
 import time
 import glob
-import subprocess
 
 from datetime import datetime
 from abc import ABCMeta
@@ -40,8 +45,19 @@ import zmq
 import pandas as pd
 from dateutil.parser import parse as parse_date
 
+try:
+    # optional - c-accelerated json for the per-tick broadcast path
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    # optional - c timestamp parser, much faster than strptime
+    import ciso8601
+except ImportError:
+    ciso8601 = None
+
 from numpy import (
-    isnan as np_isnan,
     nan as np_nan,
     int64 as np_int64
 )
@@ -50,7 +66,7 @@ from kinetick import (
     path,
 )
 from kinetick.utils import utils, asynctools
-from mongoengine import connect as mongo_connect, NotUniqueError, Q
+from mongoengine import connect as mongo_connect, NotUniqueError
 from kinetick.enums import Timeframes, COMMON_TYPES
 from kinetick.lib.brokers import Webull
 from kinetick.models import Tick, OHLC
@@ -77,6 +93,24 @@ asynctools.multitasking.createPool(__name__, __threads__)
 cash_ticks = {}
 
 
+class _BarState(object):
+    """ the forming minute bar for one symbol - updated in O(1) per tick """
+    __slots__ = ('minute', 'open', 'high', 'low', 'close', 'volume')
+
+    def __init__(self, minute, price, size):
+        self.minute = minute
+        self.open = self.high = self.low = self.close = price
+        self.volume = size
+
+    def update(self, price, size):
+        if price > self.high:
+            self.high = price
+        if price < self.low:
+            self.low = price
+        self.close = price
+        self.volume += size
+
+
 class Blotter():
     """Broker class initilizer
 
@@ -124,17 +158,8 @@ class Blotter():
         # do not act on first tick (timezone is incorrect)
         self.first_tick = True
 
-        self._bars = pd.DataFrame(
-            columns=['open', 'high', 'low', 'close', 'volume'])
-        self._bars.index.names = ['datetime']
-        self._bars.index = pd.to_datetime(self._bars.index, utc=True)
-        # self._bars.index = self._bars.index.tz_convert(settings['timezone'])
-        self._bars = {"~": self._bars}
-
-        self._raw_bars = pd.DataFrame(columns=['last', 'volume'])
-        self._raw_bars.index.names = ['datetime']
-        self._raw_bars.index = pd.to_datetime(self._raw_bars.index, utc=True)
-        self._raw_bars = {"~": self._raw_bars}
+        # per-symbol forming-minute bar state (scalar ohlcv, no frames)
+        self._bar_states = {}
 
         # global objects
         self.db_connection = None
@@ -144,6 +169,13 @@ class Blotter():
 
         self.symbol_ids = {}  # cache
         self.cash_ticks = cash_ticks  # outside cache
+        self._tick_sigs = {}  # per-symbol digest of the last tick
+        self._sym_meta = {}  # memoized (symbol_group, asset_class)
+        self._sym_tpl = {}  # per-symbol constant tick fields
+
+        # background db writer (started on first persisted document)
+        self._db_queue = None
+        self._db_queue_lock = threading.Lock()
         self.rtvolume = set()  # has RTVOLUME?
 
         # override args with any (non-default) command-line args
@@ -160,6 +192,9 @@ class Blotter():
             if self.args['zmqtopic'] is None:
                 self.args['zmqtopic'] = zmqtopic
 
+        # topic frame is constant - encode it once
+        self._topic_bytes = str(self.args['zmqtopic']).encode()
+
         # if no path given for symbols' csv, use same dir
         if symbols == "symbols.csv":
             symbols = path['caller'] + '/' + symbols
@@ -187,6 +222,25 @@ class Blotter():
         # be aware of thread count
         self.threads = asynctools.multitasking.getPool(__name__)['threads']
 
+        # broker callback dispatch - one dict lookup per message
+        # instead of walking an if/elif chain
+        self._dispatch = {
+            "handleConnectionClosed": self._on_connection_closed,
+            "handleHistoricalData": self.on_ohlc_received,
+            "handleMarketQuote":
+                lambda msg, kwargs: self.on_quote_received(
+                    kwargs['tickerId']),
+            "handleTickPrice": self._on_tick_message,
+            "handleTickSize": self._on_tick_message,
+            "handleTickString": self._on_tick_message,
+            "handleTickOptionComputation":
+                lambda msg, kwargs: self.on_option_computation_received(
+                    msg['tickerId']),
+            "handleMarketDepth":
+                lambda msg, kwargs: self.on_orderbook_received(
+                    msg['tickerId']),
+        }
+
     # -------------------------------------------
     def _on_exit(self, terminate=True):
         if "as_client" in self.args:
@@ -220,32 +274,19 @@ class Blotter():
     def _detect_running_blotter(name):
         return name
 
-    # -------------------------------------------
-    @staticmethod
-    def _blotter_file_running():
-        try:
-            # not sure how this works on windows...
-            command = 'pgrep -f ' + sys.argv[0]
-            process = subprocess.Popen(
-                command, shell=True, stdout=subprocess.PIPE)
-            stdout_list = process.communicate()[0].decode('utf-8').split("\n")
-            stdout_list = list(filter(None, stdout_list))
-            return len(stdout_list) > 0
-        except Exception as e:
-            return False
-
     # -------------------------------------------
     def _check_unique_blotter(self):
-        if os.path.exists(self.args_cache_file):
-            # temp file found - check if really running
-            # or if this file wasn't deleted due to crash
-            if not self._blotter_file_running():
-                # print("REMOVING OLD TEMP")
-                self._remove_cached_args()
-            else:
-                self.duplicate_run = True
-                self.log_blotter.error("Blotter is already running...")
-                # sys.exit(1)
+        # hold a non-blocking flock for the process lifetime - a
+        # crashed blotter releases it automatically, so no pgrep
+        # fork/exec and no stale-tempfile guesswork
+        lock_file = self.args_cache_file + ".lock"
+        self._lock_fd = os.open(lock_file, os.O_RDWR | os.O_CREAT, 0o666)
+        try:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self.duplicate_run = True
+            self.log_blotter.error("Blotter is already running...")
+            # sys.exit(1)
 
         self._write_cached_args()
 
@@ -256,11 +297,14 @@ class Blotter():
 
     def _read_cached_args(self):
         if os.path.exists(self.args_cache_file):
-            return pickle.load(open(self.args_cache_file, "rb"))
+            with open(self.args_cache_file, "rb") as cache_file:
+                return pickle.load(cache_file)
         return {}
 
     def _write_cached_args(self):
-        pickle.dump(self.args, open(self.args_cache_file, "wb"))
+        with open(self.args_cache_file, "wb") as cache_file:
+            pickle.dump(self.args, cache_file,
+                        protocol=pickle.HIGHEST_PROTOCOL)
         utils.chmod(self.args_cache_file)
 
     # -------------------------------------------
@@ -312,35 +356,42 @@ class Blotter():
         # self.log_blotter.debug("caller: [%s]", caller)
         # self.log_blotter.debug("Message Received: %s", msg)
 
-        if caller == "handleConnectionClosed":
-            self.log_blotter.info("Lost connection to Broker...")
-            # let docker handle the restarts
-            self._on_exit(terminate=True)
-            # self.run()
-
-        elif caller == "handleHistoricalData":
-            self.on_ohlc_received(msg, kwargs)
+        handler = self._dispatch.get(caller)
+        if handler is not None:
+            handler(msg, kwargs)
 
-        # elif caller == "handleTickString":
-        #     self.on_tick_string_received(msg['tickerId'], kwargs)
-
-        elif caller == "handleMarketQuote":
-            self.on_quote_received(kwargs['tickerId'])
-
-        elif caller == "handleTickPrice" or caller == "handleTickSize" or caller == "handleTickString":
-            tickerId = msg['tickerId']
-            self.on_tick_string_received(tickerId, kwargs)
-
-        elif caller in "handleTickOptionComputation":
-            self.on_option_computation_received(msg['tickerId'])
+    # -------------------------------------------
+    def _on_connection_closed(self, msg, kwargs):
+        self.log_blotter.info("Lost connection to Broker...")
+        # let docker handle the restarts
+        self._on_exit(terminate=True)
+        # self.run()
 
-        elif caller == "handleMarketDepth":
-            self.on_orderbook_received(msg['tickerId'])
+    def _on_tick_message(self, msg, kwargs):
+        self.on_tick_string_received(msg['tickerId'], kwargs)
 
-        elif caller == "handleError":
-            # don't display connection errors on ctrl+c
-            if self.quitting:
-                return
+    # -------------------------------------------
+    def _symbol_meta(self, symbol):
+        """ memoized (symbol_group, asset_class) for a symbol """
+        meta = self._sym_meta.get(symbol)
+        if meta is None:
+            meta = (utils.gen_symbol_group(symbol),
+                    utils.gen_asset_class(symbol))
+            self._sym_meta[symbol] = meta
+        return meta
+
+    def _tick_template(self, symbol):
+        """ per-symbol constant tick fields, built once and copied per tick """
+        tpl = self._sym_tpl.get(symbol)
+        if tpl is None:
+            symbol_group, asset_class = self._symbol_meta(symbol)
+            tpl = {
+                "symbol": symbol,
+                "symbol_group": symbol_group,  # ES_F, ...
+                "asset_class": asset_class,
+            }
+            self._sym_tpl[symbol] = tpl
+        return tpl
 
     # -------------------------------------------
     def on_ohlc_received(self, msg, kwargs):
@@ -348,16 +399,19 @@ class Blotter():
 
         # print(msg)
         # msg.index.names = ['datetime']
-        msg['datetime'] = msg.index
+        # convert the whole index to UTC strings in one shot instead
+        # of a dateutil parse + astimezone per row
+        idx = pd.to_datetime(msg.index)
+        if idx.tz is None:
+            idx = idx.tz_localize(utils.get_timezone())
+        dts = idx.tz_convert("UTC").strftime("%Y-%m-%d %H:%M:%S")
         data = msg.to_dict(orient='records')
 
-        for row in data:
+        for i, row in enumerate(data):
             params = {"tickerId": str(kwargs['tickerId']), "symbol": symbol,
                       # "symbol_group": utils.gen_symbol_group(symbol), "asset_class": utils.gen_asset_class(
                       # symbol),
-                      "datetime": utils.datetime_to_timezone(
-                          parse_date(str(row['datetime'])), tz="UTC"
-                      ).strftime("%Y-%m-%d %H:%M:%S"), "open": utils.to_decimal(row['open']),
+                      "datetime": dts[i], "open": utils.to_decimal(row['open']),
                       "high": utils.to_decimal(row['high']), "low": utils.to_decimal(row['low']),
                       "close": utils.to_decimal(row['close']), "volume": int(row['volume']),
                       "vwap": utils.to_decimal(row['vwap']), "resolution": self.backfill_resolution}
@@ -392,20 +446,18 @@ class Blotter():
         # for instruments that receive RTVOLUME events
         if "tick" in kwargs:
             self.rtvolume.add(symbol)
-            data = {
+            data = dict(
+                self._tick_template(symbol),
                 # available data from ib
-                "symbol": symbol,
-                "symbol_group": utils.gen_symbol_group(symbol),  # ES_F, ...
-                "asset_class": utils.gen_asset_class(symbol),
-                "timestamp": kwargs['tick']['time'],
-                "last": utils.to_decimal(kwargs['tick']['last']),
-                "lastsize": int(kwargs['tick']['size']),
-                "bid": utils.to_decimal(kwargs['tick']['bid']),
-                "ask": utils.to_decimal(kwargs['tick']['ask']),
-                "bidsize": int(kwargs['tick']['bidsize']),
-                "asksize": int(kwargs['tick']['asksize']),
-                # "wap":          kwargs['tick']['wap'],
-            }
+                timestamp=kwargs['tick']['time'],
+                last=utils.to_decimal(kwargs['tick']['last']),
+                lastsize=int(kwargs['tick']['size']),
+                bid=utils.to_decimal(kwargs['tick']['bid']),
+                ask=utils.to_decimal(kwargs['tick']['ask']),
+                bidsize=int(kwargs['tick']['bidsize']),
+                asksize=int(kwargs['tick']['asksize']),
+                # wap=kwargs['tick']['wap'],
+            )
 
         # for instruments that DOESN'T receive RTVOLUME events (exclude options)
         elif symbol not in self.rtvolume and \
@@ -415,31 +467,30 @@ class Blotter():
             # print(tick)
 
             if not tick.empty and tick['last'].values[-1] > 0 < tick['lastsize'].values[-1]:
-                data = {
+                data = dict(
+                    self._tick_template(symbol),
                     # available data from ib
-                    "symbol": symbol,
-                    "tickerId": str(tickerId),
-                    # ES_F, ...
-                    "symbol_group": utils.gen_symbol_group(symbol),
-                    "asset_class": utils.gen_asset_class(symbol),
-                    "timestamp": tick.index.values[-1],
-                    "datetime": tick.index.values[-1],
-                    "last": utils.to_decimal(tick['last'].values[-1]),
-                    "lastsize": int(tick['lastsize'].values[-1]),
-                    "buy": utils.to_decimal(tick['buy'].values[-1]),
-                    "sell": utils.to_decimal(tick['sell'].values[-1]),
-                    "buysize": int(tick['buysize'].values[-1]),
-                    "sellsize": int(tick['sellsize'].values[-1])
-                    # "wap":          kwargs['tick']['wap'],
-                }
+                    tickerId=str(tickerId),
+                    timestamp=tick.index.values[-1],
+                    datetime=tick.index.values[-1],
+                    last=utils.to_decimal(tick['last'].values[-1]),
+                    lastsize=int(tick['lastsize'].values[-1]),
+                    buy=utils.to_decimal(tick['buy'].values[-1]),
+                    sell=utils.to_decimal(tick['sell'].values[-1]),
+                    buysize=int(tick['buysize'].values[-1]),
+                    sellsize=int(tick['sellsize'].values[-1])
+                    # wap=kwargs['tick']['wap'],
+                )
 
         # proceed if data exists
         if data is not None:
-            # cache last tick
-            if symbol in self.cash_ticks.keys():
-                if data == self.cash_ticks[symbol]:
-                    return
+            # cache last tick - one integer compare instead of a full
+            # dict walk with per-field Decimal equality
+            sig = hash(tuple(data.values()))
+            if self._tick_sigs.get(symbol) == sig:
+                return
 
+            self._tick_sigs[symbol] = sig
             self.cash_ticks[symbol] = data
 
             # add options fields
@@ -465,11 +516,11 @@ class Blotter():
                 quote = utils.mark_options_values(quote)
             else:
                 quote = self.connection.marketQuoteData[tickerId].to_dict(orient='records')[0]
-                quote["symbol_group"] = utils.gen_symbol_group(symbol)
+                quote["symbol_group"] = self._symbol_meta(symbol)[0]
 
             quote["symbol"] = symbol
             quote["tickerId"] = str(tickerId)
-            quote["asset_class"] = utils.gen_asset_class(symbol)
+            quote["asset_class"] = self._symbol_meta(symbol)[1]
             quote['bid'] = utils.to_decimal(quote['bid'])
             quote['ask'] = utils.to_decimal(quote['ask'])
             # quote['last'] = utils.to_decimal(quote['last'])
@@ -483,7 +534,7 @@ class Blotter():
                 ).strftime("%Y-%m-%d %H:%M:%S.%f")
                 quote['datetime'] = quote['timestamp']
                 # create synthetic tick
-                if symbol in self.cash_ticks.keys() and quote['last'] != self.cash_ticks[symbol]:
+                if symbol in self.cash_ticks and quote['last'] != self.cash_ticks[symbol]:
                     self.on_tick_received(quote)
                 else:
                     self.broadcast(quote, "QUOTE")
@@ -517,35 +568,34 @@ class Blotter():
             self.connection.contracts[tickerId].strike)
         tick["symbol_group"] = self.connection.contracts[tickerId].symbol + \
                                '_' + self.connection.contracts[tickerId].sec_type
-        tick['volume'] = int(tick['volume'])
-        tick['bid'] = utils.to_decimal(tick['bid'])
-        tick['bidsize'] = int(tick['bidsize'])
-        tick['ask'] = utils.to_decimal(tick['ask'])
-        tick['asksize'] = int(tick['asksize'])
-        tick['last'] = utils.to_decimal(tick['last'])
-        tick['lastsize'] = int(tick['lastsize'])
-
-        tick['price'] = utils.to_decimal(tick['price'], 2)
-        tick['underlying'] = utils.to_decimal(tick['underlying'])
-        tick['dividend'] = utils.to_decimal(tick['dividend'])
-        tick['volume'] = int(tick['volume'])
-        tick['iv'] = utils.to_decimal(tick['iv'])
-        tick['oi'] = int(tick['oi'])
-        tick['delta'] = utils.to_decimal(tick['delta'])
-        tick['gamma'] = utils.to_decimal(tick['gamma'])
-        tick['vega'] = utils.to_decimal(tick['vega'])
-        tick['theta'] = utils.to_decimal(tick['theta'])
+        # batch the numeric coercions - one pass over two tuples of
+        # keys instead of a utils.to_decimal dispatch per field
+        float_keys = ('bid', 'ask', 'last', 'underlying', 'dividend',
+                      'iv', 'delta', 'gamma', 'vega', 'theta')
+        int_keys = ('bidsize', 'asksize', 'lastsize', 'volume', 'oi')
+        try:
+            for key in float_keys:
+                tick[key] = float(tick[key])
+            for key in int_keys:
+                tick[key] = int(tick[key])
+            tick['price'] = round(float(tick['price']), 2)
+        except (TypeError, ValueError):
+            # odd payload - fall back to the guarded per-field coercion
+            for key in float_keys:
+                tick[key] = utils.to_decimal(tick[key])
+            for key in int_keys:
+                tick[key] = int(tick[key])
+            tick['price'] = utils.to_decimal(tick['price'], 2)
 
         tick["symbol"] = symbol
-        tick["symbol_group"] = utils.gen_symbol_group(symbol)
-        tick["asset_class"] = utils.gen_asset_class(symbol)
+        tick["symbol_group"], tick["asset_class"] = self._symbol_meta(symbol)
 
         tick = utils.mark_options_values(tick)
 
         # is this a really new tick?
         prev_last = 0
         prev_lastsize = 0
-        if symbol in self.cash_ticks.keys():
+        if symbol in self.cash_ticks:
             prev_last = self.cash_ticks[symbol]['last']
             prev_lastsize = self.cash_ticks[symbol]['lastsize']
             if tick == self.cash_ticks[symbol]:
@@ -581,8 +631,8 @@ class Blotter():
         # add symbol data to list
         symbol = self.connection.tickerSymbol(tickerId)
         orderbook['symbol'] = symbol
-        orderbook["symbol_group"] = gen_symbol_group(symbol)
-        orderbook["asset_class"] = gen_asset_class(symbol)
+        orderbook["symbol_group"], orderbook["asset_class"] = \
+            self._symbol_meta(symbol)
         orderbook["kind"] = "ORDERBOOK"
 
         quoteStore = Tick(tickerId=str(tickerId), symbol=symbol, kind="QUOTE", bid=float(orderbook['bid'][0]),
@@ -596,27 +646,20 @@ class Blotter():
     # -------------------------------------------
     @asynctools.multitasking.task
     def on_tick_received(self, tick):
-        # data
-        symbol = tick['symbol']
-        timestamp = datetime.strptime(tick['timestamp'],
-                                      COMMON_TYPES["DATE_TIME_FORMAT_LONG_MILLISECS"])
-
-        # do not act on first tick (timezone is incorrect)
+        # do not act on first tick (timezone is incorrect) - and skip
+        # parsing the timestamp of a tick we're about to drop
         if self.first_tick:
             self.first_tick = False
             return
 
-        try:
-            timestamp = parse_date(timestamp)
-        except Exception as e:
-            pass
-
-        # placeholders
-        if symbol not in self._raw_bars:
-            self._raw_bars[symbol] = self._raw_bars['~']
-
-        if symbol not in self._bars:
-            self._bars[symbol] = self._bars['~']
+        # data
+        symbol = tick['symbol']
+        if ciso8601 is not None:
+            timestamp = ciso8601.parse_datetime(tick['timestamp'])
+        else:
+            timestamp = datetime.strptime(
+                tick['timestamp'],
+                COMMON_TYPES["DATE_TIME_FORMAT_LONG_MILLISECS"])
 
         # send tick to message self.broadcast
         tick["kind"] = "TICK"
@@ -624,46 +667,41 @@ class Blotter():
         tickStore = Tick(**tick)
         self.log2db(tickStore)
 
-        # add tick to raw self._bars
-        tick_data = pd.DataFrame(index=['timestamp'],
-                                 data={'timestamp': timestamp,
-                                       'last': tick['last'],
-                                       'volume': tick['lastsize']})
-        tick_data.set_index(['timestamp'], inplace=True)
-        _raw_bars = self._raw_bars[symbol].copy()
-        _raw_bars = _raw_bars.append(tick_data)
-
-        # add utils.resampled raw to self._bars
-        ohlc = _raw_bars['last'].resample('1T').ohlc()
-        vol = _raw_bars['volume'].resample('1T').sum()
-
-        opened_bar = ohlc
-        opened_bar['volume'] = vol
-
-        # add bar to self._bars object
-        previous_bar_count = len(self._bars[symbol])
-        self._bars[symbol] = self._bars[symbol].append(opened_bar)
-        self._bars[symbol] = self._bars[symbol].groupby(
-            self._bars[symbol].index).last()
-
-        if len(self._bars[symbol].index) > previous_bar_count:
-            self.log_blotter.debug(f"__Bars__ {self._bars[symbol].to_dict(orient='records')[0]} \
+        # aggregate the forming minute bar in O(1) scalar updates -
+        # no frame copy/append or full resample per tick
+        price = float(tick['last'])
+        size = int(tick['lastsize'])
+        minute = pd.Timestamp(timestamp).value // 60_000_000_000
+
+        state = self._bar_states.get(symbol)
+        if state is None:
+            self._bar_states[symbol] = _BarState(minute, price, size)
+        elif minute == state.minute:
+            state.update(price, size)
+        else:
+            # minute rolled over - flush the completed bar
+            bar = {
+                "open": state.open,
+                "high": state.high,
+                "low": state.low,
+                "close": state.close,
+                "volume": state.volume,
+                "symbol": symbol,
+                "symbol_group": tick['symbol_group'],
+                "asset_class": tick['asset_class'],
+                "timestamp": pd.Timestamp(
+                    state.minute * 60_000_000_000).strftime(
+                    COMMON_TYPES["DATE_TIME_FORMAT_LONG"])
+            }
+            self.log_blotter.debug(f"__Bars__ {bar} \
             +{datetime.fromtimestamp(time.time())}")
-            bar = self._bars[symbol].to_dict(orient='records')[0]
-            bar["symbol"] = symbol
-            bar["symbol_group"] = tick['symbol_group']
-            bar["asset_class"] = tick['asset_class']
-            bar["timestamp"] = self._bars[symbol].index[0].strftime(
-                COMMON_TYPES["DATE_TIME_FORMAT_LONG"])
 
             bar["kind"] = "BAR"
             self.broadcast(bar, "BAR")
             barStore = OHLC(**bar, tickerId=tick['tickerId'])
             self.log2db(barStore)
 
-            self._bars[symbol] = self._bars[symbol][-1:]
-            _raw_bars.drop(_raw_bars.index[:], inplace=True)
-        self._raw_bars[symbol] = _raw_bars
+            self._bar_states[symbol] = _BarState(minute, price, size)
 
     # -------------------------------------------
     def broadcast(self, data, kind):
@@ -676,12 +714,20 @@ class Blotter():
                     return int(o)
             raise TypeError
 
-        string2send = "%s %s" % (
-            self.args["zmqtopic"], json.dumps(data, default=int64_handler))
-
-        # print(kind, string2send)
         try:
-            self.socket.send_string(string2send)
+            if orjson is not None:
+                payload = orjson.dumps(data, default=int64_handler,
+                                       option=orjson.OPT_SERIALIZE_NUMPY)
+            else:
+                payload = json.dumps(data, default=int64_handler).encode()
+
+            # two frames: no topic+payload string concat, and prefix
+            # subscriptions still match on the first frame. DONTWAIT
+            # keeps the tick path from ever parking on the socket --
+            # if the send queue is full the message is dropped instead
+            self.socket.send_multipart(
+                [self._topic_bytes, payload], copy=False,
+                flags=zmq.DONTWAIT)
         except Exception as e:
             pass
 
@@ -692,10 +738,41 @@ class Blotter():
                 return
             if isinstance(data, Tick):
                 return
-            data.save()
+            # hand off to the writer thread - the tick pipeline never
+            # waits on a db round-trip
+            if self._db_queue is None:
+                with self._db_queue_lock:
+                    if self._db_queue is None:
+                        self._db_queue = queue.SimpleQueue()
+                        threading.Thread(target=self._db_worker,
+                                         daemon=True).start()
+            self._db_queue.put_nowait(data)
         except Exception as e:
             self.log_blotter.error("Error inserting data into db %s", e)
 
+    def _db_worker(self):
+        """ drain queued documents and bulk-insert them per collection """
+        while True:
+            docs = [self._db_queue.get()]
+            # batch whatever else is already waiting
+            try:
+                while len(docs) < 500:
+                    docs.append(self._db_queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            by_model = {}
+            for doc in docs:
+                by_model.setdefault(type(doc), []).append(doc)
+
+            for model, batch in by_model.items():
+                try:
+                    model._get_collection().insert_many(
+                        [doc.to_mongo() for doc in batch], ordered=False)
+                except Exception as e:
+                    self.log_blotter.error(
+                        "Error inserting data into db %s", e)
+
     # -------------------------------------------
     def run(self):
         """Starts the blotter
@@ -711,9 +788,16 @@ class Blotter():
 
         self.context = zmq.Context(zmq.REP)
         self.socket = self.context.socket(zmq.PUB)
+        # burst tolerance: deep send queue + large kernel buffer so
+        # zmq can batch small tick frames into single tcp writes;
+        # don't linger on shutdown
+        self.socket.setsockopt(zmq.SNDHWM, 100000)
+        self.socket.setsockopt(zmq.SNDBUF, 1 << 20)
+        self.socket.setsockopt(zmq.LINGER, 0)
         self.socket.bind("tcp://*:" + str(self.args['zmqport']))
 
         db_modified = 0
+        db_hash = None
         contracts = []
         prev_contracts = []
         first_run = True
@@ -730,9 +814,9 @@ class Blotter():
             while True:
 
                 if not os.path.exists(self.args['symbols']):
-                    pd.DataFrame(columns=['symbol', 'sec_type', 'exchange',
-                                          'currency', 'expiry', 'strike', 'opt_type']
-                                 ).to_csv(self.args['symbols'], header=True, index=False)
+                    with open(self.args['symbols'], 'w') as symfile:
+                        symfile.write("symbol,sec_type,exchange,"
+                                      "currency,expiry,strike,opt_type\n")
                     utils.chmod(self.args['symbols'])
                 else:
                     time.sleep(0.1)
@@ -758,33 +842,75 @@ class Blotter():
                     # continue...
                     db_modified = db_last_modified
 
-                    # read contructs db
-                    df = pd.read_csv(self.args['symbols'], header=0)
-                    if df.empty:
+                    # read contructs db - a content hash gates the
+                    # parse, so touch-only modifications are free
+                    with open(self.args['symbols'], 'rb') as symfile:
+                        raw = symfile.read()
+                    raw_hash = hashlib.blake2b(raw, digest_size=16).digest()
+                    if not first_run and raw_hash == db_hash:
                         continue
+                    db_hash = raw_hash
 
-                    # removed expired
-                    df = df[(
-                                    (df['expiry'] < 1000000) & (
-                                    df['expiry'] >= int(datetime.now().strftime('%Y%m')))) | (
-                                    (df['expiry'] >= 1000000) & (
-                                    df['expiry'] >= int(datetime.now().strftime('%Y%m%d')))) |
-                            np_isnan(df['expiry'])
-                            ]
-
-                    # fix expiry formatting (no floats)
-                    df['expiry'] = df['expiry'].fillna(
-                        0).astype(int).astype(str)
-                    df.loc[df['expiry'] == "0", 'expiry'] = ""
-                    df = df[df['sec_type'] != 'BAG']
-
-                    df.fillna("", inplace=True)
-                    df.to_csv(self.args['symbols'], header=True, index=False)
-                    utils.chmod(self.args['symbols'])
-
-                    # ignore comment
-                    df = df[~df['symbol'].str.contains("#")]
-                    contracts = [tuple(x) for x in df.values]
+                    # plain csv beats pandas type-inference for a
+                    # file this small
+                    rows = [row for row in csv.reader(
+                        io.StringIO(raw.decode())) if row]
+                    if len(rows) < 2:
+                        continue
+                    header, rows = rows[0], rows[1:]
+
+                    now = datetime.now()
+                    year_month = int(now.strftime('%Y%m'))
+                    year_month_day = int(now.strftime('%Y%m%d'))
+
+                    # remove expired and normalize expiry (no floats)
+                    kept = []
+                    for row in rows:
+                        symbol, sec_type, exchange, currency, \
+                            expiry, strike, opt_type = (row + [""] * 7)[:7]
+                        if sec_type == "BAG":
+                            continue
+                        try:
+                            exp = int(float(expiry))
+                        except ValueError:
+                            exp = None
+                        if exp is None:
+                            expiry = ""
+                        elif exp < 1000000:
+                            if exp < year_month:
+                                continue
+                            expiry = str(exp)
+                        elif exp < year_month_day:
+                            continue
+                        else:
+                            expiry = str(exp)
+                        kept.append([symbol, sec_type, exchange,
+                                     currency, expiry, strike, opt_type])
+
+                    # write back only when normalization changed bytes
+                    buf = io.StringIO()
+                    writer = csv.writer(buf, lineterminator="\n")
+                    writer.writerow(header)
+                    writer.writerows(kept)
+                    normalized = buf.getvalue().encode()
+                    if normalized != raw:
+                        with open(self.args['symbols'], 'wb') as symfile:
+                            symfile.write(normalized)
+                        utils.chmod(self.args['symbols'])
+                        db_hash = hashlib.blake2b(
+                            normalized, digest_size=16).digest()
+
+                    # ignore comment; strike stays numeric for the
+                    # downstream contract-string formatting
+                    contracts = []
+                    for row in kept:
+                        if "#" in row[0]:
+                            continue
+                        try:
+                            row[5] = float(row[5])
+                        except ValueError:
+                            pass
+                        contracts.append(tuple(row))
 
                     if first_run:
                         first_run = False
@@ -845,52 +971,35 @@ class Blotter():
         cols = df.columns[df.columns.str.startswith('Unnamed:')].tolist()
         df.drop(cols, axis=1, inplace=True)
 
-        # remove future dates
+        # remove future dates - one boolean mask instead of a python
+        # set difference over row labels
         df['datetime'] = pd.to_datetime(df['datetime'], utc=True)
-        blacklist = df[df['datetime'] > pd.to_datetime('now', utc=True)]
-        df = df.loc[set(df.index) - set(blacklist)]  # .tail()
-
-        # loop through data, symbol by symbol
-        dfs = []
-        bad_ids = [blacklist['_id'].values.tolist()]
-
-        for symbol_id in list(df['symbol'].unique()):
-
-            data = df[df['symbol'] == symbol_id].copy()
-
-            # sort by id
-            data.sort_values('datetime', axis=0, ascending=True, inplace=False)
-
-            # convert index to column
-            # data.loc[:, "ix"] = data.index
-            # data.reset_index(inplace=True)
-
-            # find out of sequence ticks/bars
-            malformed = data.shift(1)[(data['resolution'] != data['resolution'].shift(1)) & (
-                    data['datetime'] < data['datetime'].shift(1))]
-
-            # cleanup rows
-            if malformed.empty:
-                # if all rows are in sequence, just remove last row
-                dfs.append(data)
-            else:
-                # remove out of sequence rows + last row from data
-                index = [
-                    x for x in data.index.values if x not in malformed['datetime'].values]
-                dfs.append(data.loc[index])
-
-                # add to bad id list (to remove from db)
-                bad_ids.append(list(malformed['_id'].values))
-
-        # combine all lists
-        data = pd.concat(dfs, sort=True)
+        future_mask = (df['datetime'] > pd.Timestamp.now('UTC')).to_numpy()
+        bad_ids = [df.loc[future_mask, '_id'].tolist()]
+        df = df.loc[~future_mask]
+
+        # find out of sequence ticks/bars across all symbols in one
+        # pass - a grouped shift over the arrival order instead of a
+        # slice/copy per symbol
+        grouped = df.groupby('symbol', sort=False, observed=True)
+        prev_res = grouped['resolution'].shift(1)
+        prev_dt = grouped['datetime'].shift(1)
+        malformed_mask = ((df['resolution'] != prev_res) &
+                          (df['datetime'] < prev_dt)).to_numpy()
+
+        # cleanup rows + add to bad id list (to remove from db)
+        if malformed_mask.any():
+            bad_ids.append(df.loc[malformed_mask, '_id'].tolist())
+            df = df.loc[~malformed_mask]
+
+        data = df.sort_values(['symbol', 'datetime'], kind='stable')
 
         # flatten bad ids
         bad_ids = sum(bad_ids, [])
 
         # remove bad ids from db
         if bad_ids:
-            bad_ids = list(map(str, map(int, bad_ids)))
+            bad_ids = list(map(str, bad_ids))
             self.log_blotter.warning("Bad Ids found", bad_ids)
 
         # return
@@ -928,19 +1037,24 @@ class Blotter():
         table = 'ticks' if resolution[-1] in ("K", "V", "S") else 'bars'
 
         query = {
-            'resolution': resolution
+            'resolution': resolution,
+            'datetime': {'$gte': parse_date(start)}
         }
+        if end is not None:
+            query['datetime']['$lte'] = parse_date(end)
         if symbols[0].strip() != "*":
-            query['symbol__in'] = symbols
-
-        from_to_query = (Q(datetime__gte=start) & Q(datetime__lte=end)) if end is not None else (Q(datetime__gte=start))
-        data = OHLC.objects(from_to_query, **query).order_by('datetime')  # pd.read_sql(query, self.db_connection)  # .dropna()
-        df = pd.DataFrame.from_records([json.loads(d.to_json()) for d in data])
-        # del df['_id']
+            query['symbol'] = {'$in': symbols}
+
+        # query the raw pymongo collection - BSON already yields
+        # native datetime/ObjectId values, so the per-document
+        # to_json/json.loads round trip and the $date/$oid
+        # unwrapping go away
+        cursor = OHLC._get_collection().find(query).sort('datetime', 1)
+        df = pd.DataFrame(list(cursor))
         if df.empty:
             return df
-        df['_id'] = df['_id'].apply(lambda _id: _id['$oid'])
-        df['datetime'] = df['datetime'].apply(lambda date: datetime.utcfromtimestamp(int(date['$date'] / 1000)))
+        df['_id'] = df['_id'].astype(str)
+        df['datetime'] = pd.to_datetime(df['datetime'], utc=True)
 
         # print(df)
         # clearup records that are out of sequence
@@ -962,7 +1076,7 @@ class Blotter():
 
     # -------------------------------------------
     def stream(self, symbols, tick_handler=None, bar_handler=None,
-               quote_handler=None, book_handler=None, tz="UTC"):
+               quote_handler=None, book_handler=None, tz="UTC", raw=False):
         # load runtime/default data
         if isinstance(symbols, str):
             symbols = symbols.split(',')
@@ -979,11 +1093,14 @@ class Blotter():
 
         try:
             while True:
-                message = sock.recv_string()
+                frames = sock.recv_multipart()
 
-                if self.args["zmqtopic"] in message:
-                    message = message.split(self.args["zmqtopic"])[1].strip()
-                    data = json.loads(message)
+                if len(frames) == 2:
+                    topic, payload = frames
+                    if topic != self._topic_bytes:
+                        continue
+                    data = orjson.loads(payload) if orjson is not None \
+                        else json.loads(payload)
 
                     if data['symbol'] not in symbols:
                         continue
@@ -1009,6 +1126,31 @@ class Blotter():
                                 self.log_blotter.error(e)
                             continue
 
+                    # raw mode skips the one-row DataFrame round trip
+                    # and hands the dict straight to the handler
+                    if raw:
+                        try:
+                            dt = pd.Timestamp(data["timestamp"])
+                            if dt.tz is None:
+                                dt = dt.tz_localize("UTC")
+                            data["datetime"] = dt.tz_convert(tz)
+                        except Exception as e:
+                            pass
+
+                        if data['kind'] == "TICK":
+                            if tick_handler is not None:
+                                try:
+                                    tick_handler(data)
+                                except Exception as e:
+                                    self.log_blotter.error(e)
+                        elif data['kind'] == "BAR":
+                            if bar_handler is not None:
+                                try:
+                                    bar_handler(data)
+                                except Exception as e:
+                                    self.log_blotter.error(e)
+                        continue
+
                     try:
                         data["datetime"] = parse_date(data["timestamp"])
                     except Exception as e:
@@ -1235,7 +1377,8 @@ def load_blotter_args(blotter_name=None, logger=None):
 
         args_cache_file = blotter_files[-1]
 
-    args = pickle.load(open(args_cache_file, "rb"))
+    with open(args_cache_file, "rb") as cache_file:
+        args = pickle.load(cache_file)
     args['as_client'] = True
 
     return args
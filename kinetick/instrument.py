@@ -61,8 +61,7 @@ class Instrument(str):
             return df[(df['symbol'] == symbol) | (df['symbol_group'] == symbol)].copy()
         except Exception as e:
             df = pd_concat([df[df['symbol'] == symbol]], sort=True)
-            df.loc[:, '_idx_'] = df.index
-            return df.drop_duplicates(subset=['_idx_'], keep='last').drop('_idx_', axis=1)
+            return df[~df.index.duplicated(keep='last')]
 
     # ---------------------------------------
     def get_bars(self, lookback=None, as_dict=False):
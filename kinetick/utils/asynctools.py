@@ -21,6 +21,7 @@
 
 from threading import Thread, Semaphore
 from multiprocessing import Process, cpu_count
+from concurrent.futures import ThreadPoolExecutor
 from sys import exit as sysexit, version_info as sys_version_info
 from os import _exit as osexit
 from time import sleep, time
@@ -76,11 +77,17 @@ class multitasking():
         if threads < 2:
             threads = 0
 
+        engine = Process if "process" in engine.lower() else Thread
+
         cls.__POOLS__[cls.__POOL_NAME__] = {
             "pool": Semaphore(threads) if threads > 0 else 1,
-            "engine": Process if "process" in engine.lower() else Thread,
+            "engine": engine,
             "name": name,
-            "threads": threads
+            "threads": threads,
+            # thread pools reuse workers instead of spawning a
+            # thread per task (processes keep the spawn-per-task engine)
+            "executor": ThreadPoolExecutor(max_workers=threads)
+            if threads > 0 and engine is Thread else None
         }
 
     @classmethod
@@ -101,6 +108,12 @@ class multitasking():
 
             # has threads
             if not cls.__KILL_RECEIVED__:
+                executor = cls.__POOLS__[cls.__POOL_NAME__].get('executor')
+                if executor is not None:
+                    task = executor.submit(callee, *args, **kwargs)
+                    cls.__TASKS__.append(task)
+                    return task
+
                 task = cls.__POOLS__[cls.__POOL_NAME__]['engine'](
                     target=_run_via_pool, args=args, kwargs=kwargs, daemon=False)
                 cls.__TASKS__.append(task)
@@ -119,11 +132,20 @@ class multitasking():
             return True
 
         try:
-            running = len([t.join(1)
-                           for t in cls.__TASKS__ if t is not None and t.isAlive()])
+            # executor futures
+            for task in cls.__TASKS__:
+                if task is not None and hasattr(task, 'result'):
+                    try:
+                        task.result()
+                    except Exception as e:
+                        pass
+
+            # spawned threads/processes
+            running = len([t.join(1) for t in cls.__TASKS__
+                           if t is not None and not hasattr(t, 'result') and t.isAlive()])
             while running > 0:
-                running = len(
-                    [t.join(1) for t in cls.__TASKS__ if t is not None and t.isAlive()])
+                running = len([t.join(1) for t in cls.__TASKS__
+                               if t is not None and not hasattr(t, 'result') and t.isAlive()])
         except Exception as e:
             pass
         return True
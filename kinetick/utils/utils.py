@@ -18,9 +18,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import atexit
 import decimal
 import logging
 import random
+import re
 import string
 import numpy as np
 import pandas as pd
@@ -32,11 +34,25 @@ from pandas import to_datetime as pd_to_datetime
 import time
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from stat import S_IWRITE
 from math import ceil
 
 decimal.getcontext().prec = 5
 
+_PERIODS_RE = re.compile(r'\d+')
+
+
+def _resolution_periods(res, default=None):
+    """ parse the bar count out of a resolution string (5 for '5K') """
+    match = _PERIODS_RE.search(res)
+    if match is None:
+        if default is None:
+            raise ValueError("no periods in resolution %s" % res)
+        return default
+    return int(match.group(0))
+
 
 def rand_pass(size):
     # Takes random choices from
@@ -92,12 +108,23 @@ class make_object:
 # ---------------------------------------------
 
 
+@lru_cache(maxsize=1)
+def _argv_map():
+    """ parse sys.argv once into a param->value dict """
+    params = {}
+    args = sys.argv
+    for i, arg in enumerate(args):
+        if arg.startswith("-"):
+            if i + 1 < len(args) and not args[i + 1].startswith("-"):
+                params[arg] = args[i + 1]
+            else:
+                params[arg] = True
+    return params
+
+
 def read_single_argv(param, default=None):
-    args = " ".join(sys.argv).strip().split(param)
-    if len(args) > 1:
-        args = args[1].strip().split(" ")[0]
-        return args if "-" not in args else None
-    return default
+    value = _argv_map().get(param, default)
+    return value if value is not True else None
 
 
 # ---------------------------------------------
@@ -111,10 +138,12 @@ def multi_shift(df, window):
     if isinstance(df, pd.Series):
         df = pd.DataFrame(df)
 
-    dfs = [df.shift(i) for i in np.arange(window)]
-    for ix, df_item in enumerate(dfs[1:]):
-        dfs[ix + 1].columns = [str(col) for col in df_item.columns + str(ix + 1)]
-    return pd.concat(dfs, 1, sort=True)  # .apply(list, 1)
+    arrs = [df.shift(i).to_numpy() for i in range(window)]
+    cols = [str(col) for col in df.columns]
+    for i in range(1, window):
+        cols += [str(col) + str(i) for col in df.columns]
+    return pd.DataFrame(np.concatenate(arrs, axis=1),
+                        index=df.index, columns=cols, copy=False)
 
 
 # ---------------------------------------------
@@ -139,7 +168,9 @@ def to_decimal(number, points=None):
     if not is_number(number):
         return number
 
-    number = float(decimal.Decimal(number * 1.))  # can't Decimal an int
+    # Decimal(float) is exact, so float(Decimal(x)) == float(x) - skip
+    # the Decimal allocation the old round-trip paid on every call
+    number = float(number)
     if is_number(points):
         return round(number, points)
     return number
@@ -357,8 +388,7 @@ def ib_duration_str(start_date=None):
 # ---------------------------------------------
 
 def wb_resolution(res="T"):
-    periods = ("".join([s for s in res if s.isdigit()]))
-    periods = int(periods) if len(periods) else 0
+    periods = _resolution_periods(res, default=0)
     res = res.lower()
 
     if periods > 0:
@@ -386,8 +416,11 @@ def wb_resolution(res="T"):
 
 
 # ---------------------------------------------
-def wb_lookback_str(start_date=None, end_date=datetime.utcnow(), interval=None):
-    now = end_date
+def wb_lookback_str(start_date=None, end_date=None, interval=None):
+    now = end_date if end_date is not None else datetime.utcnow()
+
+    if interval is None or interval <= 0:
+        raise ValueError("interval must be a positive number")
 
     if is_number(start_date):
         diff = now - datetime.fromtimestamp(float(start_date))
@@ -399,22 +432,9 @@ def wb_lookback_str(start_date=None, end_date=datetime.utcnow(), interval=None):
         return None
 
     # get diff
-    day_diff = diff.days
-    min_diff = int(diff.seconds / 60)
+    total_min = diff.days * 24 * 60 + int(diff.seconds / 60)
 
-    # small diff?
-    if day_diff < 0 and min_diff < 1:
-        return 0
-
-    # return str(second_diff)+ " S"
-    if day_diff == 0 and min_diff > 1:
-        return min_diff / interval
-    if 31 > day_diff > 0:
-        return (min_diff + day_diff * 24 * 60) / interval
-    if 365 > day_diff > 31:
-        return (min_diff + day_diff * 24 * 60) / interval
-
-    return (min_diff + day_diff * 24 * 60) / interval
+    return total_min / interval if total_min > 0 else 0
 
 
 # ---------------------------------------------
@@ -428,12 +448,18 @@ def datetime64_to_datetime(dt):
 
 # ---------------------------------------------
 
+@lru_cache(maxsize=256)
+def _decimals_of(res):
+    res = repr(res)
+    return len(res.split('.')[1]) if '.' in res else 0
+
+
 def round_to_fraction(val, res, decimals=None):
     """ round to closest resolution """
     if val is None:
         return 0.0
-    if decimals is None and "." in str(res):
-        decimals = len(str(res).split('.')[1])
+    if decimals is None:
+        decimals = _decimals_of(res)
 
     return round(round(val / res) * res, decimals)
 
@@ -455,7 +481,7 @@ def backdate(res, date=None, as_datetime=False, fmt='%Y-%m-%d'):
 
     new_date = date
 
-    periods = int("".join([s for s in res if s.isdigit()]))
+    periods = _resolution_periods(res)
 
     if periods > 0:
 
@@ -502,12 +528,17 @@ def previous_weekday(day=None, as_datetime=False):
 
 # ---------------------------------------------
 
+@lru_cache(maxsize=4096)
+def _is_third_friday(year, month, day, hour):
+    weekday = datetime(year, month, day).weekday()
+    defacto_friday = (weekday == 4) or (weekday == 3 and hour >= 17)
+    return defacto_friday and 14 < day < 22
+
+
 def is_third_friday(day=None):
     """ check if day is month's 3rd friday """
     day = day if day is not None else datetime.now()
-    defacto_friday = (day.weekday() == 4) or (
-            day.weekday() == 3 and day.hour() >= 17)
-    return defacto_friday and 14 < day.day < 22
+    return _is_third_friday(day.year, day.month, day.day, day.hour)
 
 
 # ---------------------------------------------
@@ -644,33 +675,61 @@ def fix_timezone(df, freq, tz=None):
 # resample based on time / tick count
 # =============================================
 
+# frames below this size aren't worth the pandas<->modin round-trip
+_MODIN_MIN_ROWS = 1_000_000
+
+
+def _maybe_modin(data):
+    """
+    swap very large frames into modin, which parallelizes the
+    pandas API transparently (opt-in via USE_MODIN - modin is
+    not a hard dependency and plain pandas is the default)
+    """
+    if str(os.getenv("USE_MODIN")).lower() not in ("1", "true", "yes"):
+        return data
+    if len(data) < _MODIN_MIN_ROWS:
+        return data
+    try:
+        import modin.pandas as mpd
+    except ImportError:
+        return data
+    return mpd.DataFrame(data)
+
+
 def resample(data, resolution="1T", tz=None, ffill=False, dropna=False,
-             sync_last_timestamp=True):
+             sync_last_timestamp=True, max_bars_per_symbol=None):
     def __finalize(data, tz=None):
         # figure out timezone
-        try:
-            tz = data.index.tz if tz is None else tz
-        except Exception as e:
-            pass
+        if tz is None:
+            tz = getattr(data.index, 'tz', None)
 
-        if str(tz) != 'None':
-            try:
+        if tz is not None:
+            if getattr(data.index, 'tz', None) is not None:
                 data.index = data.index.tz_convert(tz)
-            except Exception as e:
+            else:
                 data.index = data.index.tz_localize('UTC').tz_convert(tz)
 
         # sort by index (datetime)
         data.sort_index(inplace=True)
 
         # drop duplicate rows per instrument
-        data.loc[:, '_idx_'] = data.index
-        data.drop_duplicates(
-            subset=['_idx_', 'symbol', 'symbol_group', 'asset_class'],
-            keep='last', inplace=True)
-        data.drop('_idx_', axis=1, inplace=True)
+        # (hash timestamp + small category codes, not python strings)
+        for col in ('symbol', 'symbol_group', 'asset_class'):
+            data[col] = data[col].astype('category')
+
+        keys = pd.MultiIndex.from_arrays([
+            data.index,
+            data['symbol'].cat.codes,
+            data['symbol_group'].cat.codes,
+            data['asset_class'].cat.codes])
+
+        data = data[~keys.duplicated(keep='last')]
+
+        # hand back plain pandas if modin was swapped in
+        if hasattr(data, '_to_pandas'):
+            data = data._to_pandas()
 
         return data
-        # return data[~data.index.duplicated(keep='last')]
 
     def __resample_ticks(data, freq=1000, by='last'):
         """
@@ -681,6 +740,18 @@ def resample(data, resolution="1T", tz=None, ffill=False, dropna=False,
         by = the column name to resample by
         """
 
+        if data.empty:
+            # nothing to bar yet - hand back the empty shape callers
+            # expect (dropna below keys on these columns)
+            newdf = pd.DataFrame(columns=[
+                'open', 'high', 'low', 'close', 'volume',
+                'opt_price', 'opt_underlying', 'opt_dividend',
+                'opt_volume', 'opt_iv', 'opt_oi', 'opt_delta',
+                'opt_gamma', 'opt_theta', 'opt_vega'],
+                index=data.index[:0])
+            newdf.index.name = 'datetime'
+            return newdf
+
         data.fillna(value=np.nan, inplace=True)
 
         # get only ticks and fill missing data
@@ -697,75 +768,99 @@ def resample(data, resolution="1T", tz=None, ffill=False, dropna=False,
             price_col = 'close'
             size_col = 'volume'
 
+        # halve the bytes the groupby kernels pull through memory -
+        # greeks/iv don't need float64 precision
+        opt_cols = ['opt_underlying', 'opt_price', 'opt_dividend',
+                    'opt_volume', 'opt_iv', 'opt_oi', 'opt_delta',
+                    'opt_gamma', 'opt_theta', 'opt_vega']
+        df[opt_cols] = df[opt_cols].astype(np.float32, copy=False)
+
         # add group indicator evey N df
         if by == 'size' or by == 'lastsize' or by == 'volume':
-            df['cumvol'] = df[size_col].cumsum()
-            df['mark'] = round(
-                round(round(df['cumvol'] / .1) * .1, 2) / freq) * freq
-            df['diff'] = df['mark'].diff().fillna(0).astype(int)
-            df['grp'] = np.where(df['diff'] >= freq - 1,
-                                 (df['mark'] / freq), np.nan)
+            # single numpy pass over the raw volume array instead of
+            # four pandas ops, each allocating a full-size column
+            cumvol = np.cumsum(df[size_col].to_numpy(dtype=np.float64))
+            mark = np.round(
+                np.round(np.round(cumvol / .1) * .1, 2) / freq) * freq
+            diff = np.empty_like(mark)
+            diff[0] = 0
+            diff[1:] = mark[1:] - mark[:-1]
+            df['grp'] = np.where(diff.astype(np.int64) >= freq - 1,
+                                 mark / freq, np.nan)
         else:
-            df['grp'] = [np.nan if i %
-                                   freq else i for i in range(len(df[price_col]))]
+            idx = np.arange(len(df))
+            df['grp'] = np.where(idx % freq == 0,
+                                 idx.astype(np.float64), np.nan)
 
-        df.loc[:1, 'grp'] = 0
+        df.iloc[0, df.columns.get_loc('grp')] = 0
 
-        df.fillna(method='ffill', inplace=True)
+        df.ffill(inplace=True)
 
         # print(df[['lastsize', 'cumvol', 'mark', 'diff', 'grp']].tail(1))
 
-        # place timestamp index in T colums
-        # (to be used as future df index)
-        df['T'] = df.index
-
-        # make group the index
-        df = df.set_index('grp')
+        # grp is non-decreasing, so every bar is a contiguous segment -
+        # reduce the raw arrays per segment with ufuncs instead of
+        # building a GroupBy over the float grp values
+        grp = df['grp'].to_numpy(dtype=np.float64)
+        starts = np.flatnonzero(np.r_[True, grp[1:] != grp[:-1]])
+        ends = np.r_[starts[1:], len(grp)] - 1
 
-        # grop df
-        groupped = df.groupby(df.index, sort=False)
+        price = df[price_col].to_numpy(dtype=np.float64)
+        size = np.nan_to_num(df[size_col].to_numpy(dtype=np.float64))
 
-        # build ohlc(v) pd.dataframe from new grp column
+        # build ohlc(v) pd.dataframe from the segment boundaries
         newdf = pd.DataFrame({
-            'open': groupped[price_col].first(),
-            'high': groupped[price_col].max(),
-            'low': groupped[price_col].min(),
-            'close': groupped[price_col].last(),
-            'volume': groupped[size_col].sum(),
-
-            'opt_price': groupped['opt_price'].last(),
-            'opt_underlying': groupped['opt_underlying'].last(),
-            'opt_dividend': groupped['opt_dividend'].last(),
-            'opt_volume': groupped['opt_volume'].last(),
-            'opt_iv': groupped['opt_iv'].last(),
-            'opt_oi': groupped['opt_oi'].last(),
-            'opt_delta': groupped['opt_delta'].last(),
-            'opt_gamma': groupped['opt_gamma'].last(),
-            'opt_theta': groupped['opt_theta'].last(),
-            'opt_vega': groupped['opt_vega'].last()
-        })
+            'open': price[starts],
+            'high': np.maximum.reduceat(price, starts),
+            'low': np.minimum.reduceat(price, starts),
+            'close': price[ends],
+            'volume': np.add.reduceat(size, starts)
+        }, index=df.index.values[starts])
+
+        # opt columns were forward-filled above, so the segment's last
+        # row matches groupby('last') semantics
+        for col in ('opt_price', 'opt_underlying', 'opt_dividend',
+                    'opt_volume', 'opt_iv', 'opt_oi', 'opt_delta',
+                    'opt_gamma', 'opt_theta', 'opt_vega'):
+            newdf[col] = df[col].to_numpy()[ends]
 
         # set index to timestamp
-        newdf['datetime'] = groupped.T.head(1)
-        newdf.set_index(['datetime'], inplace=True)
+        newdf.index.name = 'datetime'
 
         return newdf
 
+    def __concurrent_apply(groups, func):
+        """
+        apply func(sym, symdata) across symbols on a thread pool -
+        the heavy lifting happens inside pandas C code, which
+        releases the GIL, so symbols resample in parallel
+        """
+        groups = list(groups)
+        if len(groups) < 2:
+            return [func(sym, symdata) for sym, symdata in groups]
+        with ThreadPoolExecutor(
+                max_workers=min(len(groups), os.cpu_count())) as pool:
+            return list(pool.map(lambda group: func(*group), groups))
+
     if data.empty:
         return __finalize(data, tz)
 
+    data = _maybe_modin(data)
+
     # ---------------------------------------------
     # force same last timestamp to all symbols before resampling
     if sync_last_timestamp:
-        data.loc[:, '_idx_'] = data.index
-        start_date = str(data.groupby(["symbol"])[
-                             ['_idx_']].min().max().values[-1]).replace('T', ' ')
-        end_date = str(data.groupby(["symbol"])[
-                           ['_idx_']].max().min().values[-1]).replace('T', ' ')
-
-        data = data[(data.index <= end_date)].drop_duplicates(
-            subset=['_idx_', 'symbol', 'symbol_group', 'asset_class'],
-            keep='first')
+        # per-symbol first/last timestamps straight off the index - no
+        # _idx_ helper column, and the dedup key degenerates to
+        # (timestamp, symbol) since group/class are constant per symbol
+        sym_ts = data.index.to_series().groupby(
+            data['symbol'].to_numpy()).agg(['min', 'max'])
+        start_date = sym_ts['min'].max()
+        end_date = sym_ts['max'].min()
+
+        keys = pd.MultiIndex.from_arrays([data.index, data['symbol']])
+        data = data[(data.index <= end_date)
+                    & ~keys.duplicated(keep='first')]
 
         # try also sync start date
         trimmed = data[data.index >= start_date]
@@ -774,52 +869,45 @@ def resample(data, resolution="1T", tz=None, ffill=False, dropna=False,
 
     # ---------------------------------------------
     # resample
-    periods = int("".join([s for s in resolution if s.isdigit()]))
-    meta_data = data.groupby(["symbol"])[
+    periods = _resolution_periods(resolution)
+    meta_data = data.groupby(["symbol"], observed=True)[
         ['symbol', 'symbol_group', 'asset_class']].last()
+    symbol_groups = meta_data['symbol_group'].to_dict()
+    asset_classes = meta_data['asset_class'].to_dict()
+    is_option = {sym: sym.endswith(('OPT', 'FOP'))
+                 for sym in meta_data.index}
     combined = []
 
-    if "K" in resolution:
+    if "K" in resolution or "V" in resolution:
         if periods > 1:
-            for sym in meta_data.index.values:
-                symdata = __resample_ticks(data[data['symbol'] == sym].copy(),
-                                           freq=periods, by='last')
-                symdata['symbol'] = sym
-                symdata['symbol_group'] = meta_data[
-                    meta_data.index == sym]['symbol_group'].values[0]
-                symdata['asset_class'] = meta_data[
-                    meta_data.index == sym]['asset_class'].values[0]
+            by = 'last' if "K" in resolution else 'lastsize'
 
-                # cleanup
-                symdata.dropna(inplace=True, subset=[
-                    'open', 'high', 'low', 'close', 'volume'])
-                if sym[-3:] in ("OPT", "FOP"):
-                    symdata.dropna(inplace=True)
-
-                combined.append(symdata)
-
-            data = pd.concat(combined, sort=True)
-
-    elif "V" in resolution:
-        if periods > 1:
-            for sym in meta_data.index.values:
-                symdata = __resample_ticks(data[data['symbol'] == sym].copy(),
-                                           freq=periods, by='lastsize')
+            def __process_symbol_ticks(sym, symdata):
+                # no defensive copy needed - groupby sub-frames are
+                # already independent and __resample_ticks copies the
+                # columns it works on
+                symdata = __resample_ticks(symdata, freq=periods, by=by)
                 symdata['symbol'] = sym
-                symdata['symbol_group'] = meta_data[
-                    meta_data.index == sym]['symbol_group'].values[0]
-                symdata['asset_class'] = meta_data[
-                    meta_data.index == sym]['asset_class'].values[0]
+                symdata['symbol_group'] = symbol_groups[sym]
+                symdata['asset_class'] = asset_classes[sym]
 
                 # cleanup
                 symdata.dropna(inplace=True, subset=[
                     'open', 'high', 'low', 'close', 'volume'])
-                if sym[-3:] in ("OPT", "FOP"):
+                if is_option[sym]:
                     symdata.dropna(inplace=True)
 
-                combined.append(symdata)
+                # trim here, while the frame is still per-symbol, so
+                # the caller doesn't need a second groupby pass
+                if max_bars_per_symbol is not None:
+                    symdata = symdata.iloc[-max_bars_per_symbol:]
 
-            data = pd.concat(combined, sort=True)
+                return symdata
+
+            combined = __concurrent_apply(
+                data.groupby('symbol', sort=False, observed=True),
+                __process_symbol_ticks)
+            data = pd.concat(combined, sort=False)
 
     # continue...
     else:
@@ -855,78 +943,72 @@ def resample(data, resolution="1T", tz=None, ffill=False, dropna=False,
             'opt_vega': 'last'
         }
 
-        for sym in meta_data.index.values:
+        def __process_symbol_bars(sym, symdata):
 
             if "last" in data.columns:
-                tick_dict = {}
-                for col in data[data['symbol'] == sym].columns:
+                # single agg pass builds the ohlc columns alongside
+                # the tick columns (instead of a second resample)
+                tick_dict = {'last': ['first', 'max', 'min', 'last']}
+                for col in symdata.columns:
                     if col in ticks_ohlc_dict.keys():
                         tick_dict[col] = ticks_ohlc_dict[col]
 
-                ohlc = data[data['symbol'] == sym]['last'].resample(
-                    resolution).ohlc()
-                symdata = data[data['symbol'] == sym].resample(
-                    resolution).apply(tick_dict).fillna(value=np.nan)
-                symdata.rename(
-                    columns={'lastsize': 'volume'}, inplace=True)
-
-                symdata['open'] = ohlc['open']
-                symdata['high'] = ohlc['high']
-                symdata['low'] = ohlc['low']
-                symdata['close'] = ohlc['close']
+                symdata = symdata.resample(resolution).agg(tick_dict)
+                symdata.columns = ['open', 'high', 'low', 'close'] + [
+                    'volume' if col == 'lastsize' else col
+                    for col in list(tick_dict)[1:]]
 
             else:
                 bar_dict = {}
-                for col in data[data['symbol'] == sym].columns:
+                for col in symdata.columns:
                     if col in bars_ohlc_dict.keys():
                         bar_dict[col] = bars_ohlc_dict[col]
 
-                original_length = len(data[data['symbol'] == sym])
-                symdata = data[data['symbol'] == sym].resample(
-                    resolution).apply(bar_dict).fillna(value=np.nan)
+                original_length = len(symdata)
+                symdata = symdata.resample(resolution).agg(bar_dict)
                 # deal with new rows caused by resample
                 if len(symdata) > original_length and ffill:
                     # volume is 0 on rows created using resample
-                    symdata['volume'].fillna(0, inplace=True)
+                    symdata['volume'] = symdata['volume'].fillna(0)
                     symdata.ffill(inplace=True)
 
-                    # no fill / return original index
-                    if ffill:
-                        symdata['open'] = np.where(symdata['volume'] <= 0,
-                                                   symdata['close'], symdata['open'])
-                        symdata['high'] = np.where(symdata['volume'] <= 0,
-                                                   symdata['close'], symdata['high'])
-                        symdata['low'] = np.where(symdata['volume'] <= 0,
-                                                  symdata['close'], symdata['low'])
-                    else:  # yes, it's unreachable
-                        symdata['open'] = np.where(symdata['volume'] <= 0,
-                                                   np.nan, symdata['open'])
-                        symdata['high'] = np.where(symdata['volume'] <= 0,
-                                                   np.nan, symdata['high'])
-                        symdata['low'] = np.where(symdata['volume'] <= 0,
-                                                  np.nan, symdata['low'])
-                        symdata['close'] = np.where(symdata['volume'] <= 0,
-                                                    np.nan, symdata['close'])
+                    # flatten rows created by resample onto the close -
+                    # one mask evaluation instead of a np.where pass
+                    # (and a fresh temp array) per column
+                    mask = symdata['volume'].to_numpy() <= 0
+                    if mask.any():
+                        close_arr = symdata['close'].to_numpy()
+                        for col in ('open', 'high', 'low'):
+                            arr = np.array(symdata[col])
+                            arr[mask] = close_arr[mask]
+                            symdata[col] = arr
 
                 # drop NANs
                 if dropna:
                     symdata.dropna(inplace=True)
 
             symdata['symbol'] = sym
-            symdata['symbol_group'] = meta_data[meta_data.index ==
-                                                sym]['symbol_group'].values[0]
-            symdata['asset_class'] = meta_data[meta_data.index ==
-                                               sym]['asset_class'].values[0]
+            symdata['symbol_group'] = symbol_groups[sym]
+            symdata['asset_class'] = asset_classes[sym]
 
             # cleanup
             symdata.dropna(inplace=True, subset=[
                 'open', 'high', 'low', 'close', 'volume'])
-            if sym[-3:] in ("OPT", "FOP"):
+            if is_option[sym]:
                 symdata.dropna(inplace=True)
 
-            combined.append(symdata)
+            # trim while still per-symbol (see __process_symbol_ticks)
+            if max_bars_per_symbol is not None:
+                symdata = symdata.iloc[-max_bars_per_symbol:]
+
+            return symdata
 
-        data = pd.concat(combined, sort=True)
+        combined = __concurrent_apply(
+            data.groupby('symbol', sort=False, observed=True),
+            __process_symbol_bars)
+        # every symdata shares the same column set, so skip the
+        # column-label sort and alignment pass
+        data = pd.concat(combined, sort=False)
         data['volume'] = data['volume'].astype(int)
 
     return __finalize(data, tz)
@@ -938,11 +1020,19 @@ def resample(data, resolution="1T", tz=None, ffill=False, dropna=False,
 
 class DataStore():
 
-    def __init__(self, output_file=None):
+    def __init__(self, output_file=None, flush_every=100):
         self.auto = None
-        self.recorded = None
         self.output_file = output_file
+        self.flush_every = flush_every
         self.rows = []
+        self._recorded = None
+        self._dirty = False
+
+        if self.output_file is not None:
+            # single worker keeps writes ordered while the event
+            # handlers never block on disk
+            self._io_pool = ThreadPoolExecutor(max_workers=1)
+            atexit.register(self.close)
 
     def record(self, timestamp, *args, **kwargs):
         """ add custom data to data store """
@@ -954,16 +1044,17 @@ class DataStore():
         # append all data
         if len(args) == 1:
             if isinstance(args[0], dict):
-                data.update(dict(args[0]))
+                data.update(args[0])
             elif isinstance(args[0], pd.DataFrame):
-                data.update(args[0][-1:].to_dict(orient='records')[0])
+                # last row as a dict without slicing off a
+                # one-row dataframe first
+                data.update(args[0].iloc[-1].to_dict())
 
         # add kwargs
         if kwargs:
-            data.update(dict(kwargs))
+            data.update(kwargs)
 
         data['datetime'] = timestamp
-        # self.rows.append(pd.DataFrame(data=data, index=[timestamp]))
 
         new_data = {}
         if "symbol" not in data.keys():
@@ -977,17 +1068,33 @@ class DataStore():
 
         new_data['datetime'] = timestamp
 
-        # append to rows
-        self.rows.append(pd.DataFrame(data=new_data, index=[timestamp]))
+        # append to rows (materialized lazily - see recorded)
+        self.rows.append(new_data)
+        self._dirty = True
+
+        if len(self.rows) % self.flush_every == 0:
+            self.flush()
 
-        # create dataframe
-        recorded = pd.concat(self.rows, sort=True)
+    @property
+    def recorded(self):
+        """ recorded events as a symbol-wide dataframe """
+        if self._dirty:
+            self._recorded = self.__materialize()
+            self._dirty = False
+        return self._recorded
+
+    def __materialize(self):
+        if not self.rows:
+            return None
+
+        recorded = pd.DataFrame(self.rows)
+        recorded.set_index('datetime', drop=False, inplace=True)
+        recorded.index.name = None
 
         if "symbol" not in recorded.columns:
-            return
+            return None
 
         # group by symbol
-        recorded['datetime'] = recorded.index
         data = recorded.groupby(['symbol', 'datetime'], as_index=False).sum()
         data.set_index('datetime', inplace=True)
 
@@ -1018,9 +1125,29 @@ class DataStore():
             recorded[sym + '_POSITION'] = recorded[sym + '_POSITION'
                                                    ].shift(1).fillna(0)
 
-        # make this public
-        self.recorded = recorded.copy()
+        return recorded
+
+    def flush(self):
+        """ hand the current snapshot to the background writer """
+        recorded = self.recorded
 
+        if recorded is None or self.output_file is None:
+            return
+
+        try:
+            self._io_pool.submit(self.__write, recorded.copy())
+        except RuntimeError:
+            # writer already shut down - write in-line
+            self.__write(recorded.copy())
+
+    def close(self):
+        """ flush pending rows and wait for the writer to finish """
+        if self.output_file is None:
+            return
+        self.flush()
+        self._io_pool.shutdown(wait=True)
+
+    def __write(self, recorded):
         # cleanup columns names before saving...
         recorded.columns = [col.replace('_FUT_', '_').replace(
             '_OPT_OPT_', '_OPT_') for col in recorded.columns]
@@ -1068,16 +1195,30 @@ def create_continuous_contract(df, resolution="1T"):
             flags = _merge_contracts(flags, new_contract)
 
         # add gap
-        flags['gap'] = 0
+        flags['gap'] = 0.0
+
+        # work on raw arrays - daily_df is index-sorted, so each
+        # expiration day is found via searchsorted instead of a full
+        # boolean scan of both frames per expiration
+        flags_index = flags.index.values
+        flags_expiry = flags['expiry'].values
+        daily_index = daily_df.index.values
+
         for expiration in expirations:
             try:
-                minidf = daily_df[daily_df.index ==
-                                  expiration][['symbol', 'expiry', 'diff']]
-                expiry = flags[
-                    (flags.index > expiration) & (
-                            flags['expiry'] >= expiration)
-                    ]['expiry'][0]
-                gap = minidf[minidf['expiry'] == expiry]['diff'][0]
+                left = daily_index.searchsorted(expiration, side='left')
+                right = daily_index.searchsorted(expiration, side='right')
+                minidf = daily_df.iloc[left:right][
+                    ['symbol', 'expiry', 'diff']]
+
+                mask = (flags_index > expiration) & (
+                        flags_expiry >= expiration)
+                first = np.flatnonzero(mask)
+                if len(first) == 0:
+                    continue
+                expiry = flags_expiry[first[0]]
+
+                gap = minidf[minidf['expiry'] == expiry]['diff'].iloc[0]
                 flags.loc[flags.index <= expiration, 'gap'] = gap
             except Exception as e:
                 pass